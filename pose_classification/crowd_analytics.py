@@ -0,0 +1,169 @@
+# Bu modül, takip döngüsünden beslenen artımlı kalabalık analitiği sağlar.
+# Her güncelleme sadece o anki kişiler üzerinden sabit sürede çalışır; loglar tekrar taranmaz:
+#   - anlık ve toplam benzersiz kişi sayısı
+#   - zaman pencerelerinde (örn. son 10 sn / 60 sn) hareket başına ortalama kişi sayısı (doluluk)
+#   - kişi ID'si başına görünür kalma (dwell) süresi
+#   - zamanla sönümlenen yoğunluk ısı haritası (küçültülmüş NumPy ızgarası)
+# Sonuçlar her an sorgulanabilir ve belirli aralıklarla diske (JSON + .npy) yazılır.
+import json
+import math
+import os
+from collections import deque
+import numpy as np
+
+DEFAULT_WINDOWS = (10.0, 60.0, 300.0)  # saniye
+BUCKET_SECONDS = 1.0                   # Pencere toplamları bu genişlikte kovalarda tutulur
+
+class SlidingActionWindow:
+    """Son window_seconds içinde hareket başına kişi-saniye toplamını ve kapsanan süreyi tutan kayan pencere"""
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.buckets = deque()  # [kova başlangıcı, {hareket: kişi-saniye}, kapsanan saniye]
+        self.totals = {}
+        self.covered_seconds = 0.0
+
+    def _bucket(self, frame_time):
+        bucket_start = math.floor(frame_time / BUCKET_SECONDS) * BUCKET_SECONDS
+        if not self.buckets or self.buckets[-1][0] != bucket_start:
+            self.buckets.append([bucket_start, {}, 0.0])
+        return self.buckets[-1]
+
+    def add_time(self, frame_time, seconds):
+        """Pencerenin kapsadığı süreye ekler (karede kimse olmasa da)"""
+        self._bucket(frame_time)[2] += seconds
+        self.covered_seconds += seconds
+
+    def add(self, frame_time, action, person_seconds):
+        bucket = self._bucket(frame_time)[1]
+        bucket[action] = bucket.get(action, 0.0) + person_seconds
+        self.totals[action] = self.totals.get(action, 0.0) + person_seconds
+
+    def expire(self, frame_time):
+        """Pencereden çıkan kovaları toplamlardan düşer (her kova bir kez düşülür)"""
+        while self.buckets and self.buckets[0][0] + BUCKET_SECONDS <= frame_time - self.window_seconds:
+            _, bucket, covered = self.buckets.popleft()
+            self.covered_seconds = self.covered_seconds - covered if self.buckets else 0.0
+            for action, person_seconds in bucket.items():
+                remaining = self.totals[action] - person_seconds
+                if remaining > 1e-9:
+                    self.totals[action] = remaining
+                else:
+                    del self.totals[action]
+
+    def occupancy(self):
+        """Pencere boyunca hareket başına ortalama kişi sayısı"""
+        # Kişi-saniyeler, pencerede tutulan aynı kovaların kapsadığı süreye bölünür
+        if self.covered_seconds <= 0:
+            return {}
+        return {action: person_seconds / self.covered_seconds for action, person_seconds in self.totals.items()}
+
+class CrowdAnalytics:
+    """Takip döngüsünden beslenen, her an sorgulanabilir kalabalık istatistikleri"""
+    def __init__(self, grid_size=(48, 27), heatmap_half_life=30.0, windows=DEFAULT_WINDOWS,
+                 frame_size=None, snapshot_path=None, snapshot_interval=10.0):
+        self.grid_w, self.grid_h = grid_size
+        self.heatmap_half_life = heatmap_half_life
+        self.frame_size = frame_size
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+
+        self.current_count = 0
+        self.peak_count = 0
+        self.seen_ids = set()
+        self.present_ids = set()  # Önceki güncellemede görülen ID'ler
+        self.dwell_seconds = {}
+        self.windows = [SlidingActionWindow(seconds) for seconds in windows]
+
+        # Isı haritası tembel sönümlenir: ızgara yerine ortak bir ölçek katsayısı küçülür,
+        # yeni katkılar bu ölçeğe bölünerek eklenir. Böylece güncelleme ızgara boyutundan bağımsızdır.
+        self._heatmap = np.zeros((self.grid_h, self.grid_w), dtype=np.float64)
+        self._heatmap_scale = 1.0
+
+        self.first_time = None
+        self.last_time = None
+        self.last_snapshot_time = None
+
+    def update(self, frame_time, people):
+        """
+        people: (track_id, action, (x, y)) üçlüleri; (x, y) kişinin kareye göre normalize konumu.
+        Önceki güncellemeden bu yana geçen süre her kişiye ve hareketine eklenir.
+        """
+        if self.first_time is None:
+            self.first_time = frame_time
+            self.last_snapshot_time = frame_time
+        dt = 0.0 if self.last_time is None else max(0.0, frame_time - self.last_time)
+        self.last_time = frame_time
+
+        if dt > 0 and self.heatmap_half_life:
+            self._heatmap_scale *= 0.5 ** (dt / self.heatmap_half_life)
+            if self._heatmap_scale < 1e-6:
+                # Sayısal taşmayı önlemek için ara sıra ölçek ızgaraya uygulanır
+                self._heatmap *= self._heatmap_scale
+                self._heatmap_scale = 1.0
+
+        present_ids = set()
+        for track_id, action, (x, y) in people:
+            present_ids.add(track_id)
+            self.seen_ids.add(track_id)
+            # Geçen süre sadece önceki güncellemede de görülen kişilere eklenir; yeni gelen kişi o sırada yoktu
+            if track_id in self.present_ids:
+                self.dwell_seconds[track_id] = self.dwell_seconds.get(track_id, 0.0) + dt
+                if dt > 0:
+                    for window in self.windows:
+                        window.add(frame_time, action, dt)
+            else:
+                self.dwell_seconds.setdefault(track_id, 0.0)
+            gx = min(self.grid_w - 1, max(0, int(x * self.grid_w)))
+            gy = min(self.grid_h - 1, max(0, int(y * self.grid_h)))
+            self._heatmap[gy, gx] += 1.0 / self._heatmap_scale
+
+        for window in self.windows:
+            if dt > 0:
+                window.add_time(frame_time, dt)
+            window.expire(frame_time)
+        self.present_ids = present_ids
+        count = len(present_ids)
+        self.current_count = count
+        self.peak_count = max(self.peak_count, count)
+
+        if self.snapshot_path and frame_time - self.last_snapshot_time >= self.snapshot_interval:
+            self.save_snapshot()
+            self.last_snapshot_time = frame_time
+
+    @property
+    def unique_count(self):
+        return len(self.seen_ids)
+
+    def heatmap(self):
+        """Sönümlenmiş yoğunluk ızgarasının kopyası (satır: y, sütun: x)"""
+        return (self._heatmap * self._heatmap_scale).astype(np.float32)
+
+    def density(self):
+        """Megapiksel başına anlık kişi sayısı (kare boyutu biliniyorsa)"""
+        if not self.frame_size:
+            return None
+        return self.current_count / (self.frame_size[0] * self.frame_size[1] / 1e6)
+
+    def snapshot(self):
+        """Anlık istatistikleri sözlük olarak döndürür."""
+        elapsed = 0.0 if self.first_time is None else self.last_time - self.first_time
+        return {
+            'time': self.last_time,
+            'elapsed_seconds': round(elapsed, 2),
+            'current_count': self.current_count,
+            'peak_count': self.peak_count,
+            'unique_count': self.unique_count,
+            'density_per_megapixel': self.density(),
+            'action_occupancy': {f"{window.window_seconds:g}s": window.occupancy() for window in self.windows},
+            'dwell_seconds': {str(track_id): round(seconds, 2) for track_id, seconds in self.dwell_seconds.items()},
+        }
+
+    def save_snapshot(self, path=None):
+        """İstatistikleri JSON'a, ısı haritasını aynı adlı .npy dosyasına yazar."""
+        path = path or self.snapshot_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+        np.save(os.path.splitext(path)[0] + '_heatmap.npy', self.heatmap())
@@ -3,6 +3,9 @@ import mediapipe as mp
 import pandas as pd
 import os
 import numpy as np
+import landmark_cache
+from frame_source import FrameSource
+from inference_resolution import resize_for_inference
 
 mp_pose = mp.solutions.pose
 
@@ -18,6 +21,26 @@ output_csv_dir = 'C:/Users/Meral PC/OneDrive/Masaüstü/pose_classification/data
 # Her X. kareyi işle. Bu, CSV'lerin boyutunu ve modelin işleyeceği dizi uzunluğunu azaltır.
 FRAME_SKIP_RATE = 5 # Her 5. kareyi işleyecek.
 
+# Atlanan kareler çözülmeden geçilir; 'ffmpeg' seçilirse kareler ayrı süreçte çok iş parçacığıyla çözülür.
+DECODE_BACKEND = 'opencv'
+DECODE_PREFETCH = 4  # Arka planda önceden çözülecek örneklenmiş kare sayısı (0: kapalı)
+
+# Pose modeline verilen görüntünün uzun kenarı (None: tam çözünürlük); landmark'lar orijinal kareye göre normalize edilir
+POSE_INFERENCE_SIZE = 640
+INFERENCE_LETTERBOX = False  # True: görüntü kare tuvale yerleştirilir (en-boy oranı korunur)
+
+# Landmark önbelleği: aynı video aynı ayarlarla tekrar işlenirse MediaPipe atlanır.
+USE_LANDMARK_CACHE = True
+POSE_SETTINGS = {
+    'pipeline': 'extract_keypoints',
+    'model_complexity': 1,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'frame_skip_rate': FRAME_SKIP_RATE,
+    'pose_inference_size': POSE_INFERENCE_SIZE,
+    'inference_letterbox': INFERENCE_LETTERBOX,
+}
+
 print("--- Keypoint Çıkarma Başlatılıyor ---")
 
 os.makedirs(output_csv_dir, exist_ok=True)
@@ -36,42 +59,54 @@ for action_folder in os.listdir(video_root_dir):
             if video_file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
                 print(f"  Video: {video_file} işleniyor...")
                 
-                cap = cv2.VideoCapture(video_full_path)
-                if not cap.isOpened():
-                    print(f"    Hata: '{video_file}' açılamadı. Atlanıyor.")
-                    continue
-                
-                with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-                    video_keypoints_list = [] 
-                    frame_count = 0
-                    
-                    while cap.isOpened():
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
+                cache_file, recording = (landmark_cache.load_or_none(video_full_path, POSE_SETTINGS)
+                                         if USE_LANDMARK_CACHE else (None, None))
+                if recording is not None:
+                    # Önbellekten tekrar oynat: MediaPipe hiç çalıştırılmaz
+                    video_keypoints_list = [cached.persons[0].pose_array[:, :2].reshape(-1).tolist()
+                                            for cached in recording if cached.persons]
+                else:
+                    source = FrameSource(video_full_path, frame_skip_rate=FRAME_SKIP_RATE,
+                                         backend=DECODE_BACKEND, prefetch=DECODE_PREFETCH)
+                    if not source.is_opened():
+                        print(f"    Hata: '{video_file}' açılamadı. Atlanıyor.")
+                        continue
+                    recorder = landmark_cache.LandmarkRecorder(POSE_SETTINGS, source.fps)
+
+                    with mp_pose.Pose(model_complexity=POSE_SETTINGS['model_complexity'],
+                                      min_detection_confidence=POSE_SETTINGS['min_detection_confidence'],
+                                      min_tracking_confidence=POSE_SETTINGS['min_tracking_confidence']) as pose:
+                        video_keypoints_list = [] 
                         
-                        if frame_count % FRAME_SKIP_RATE == 0:
-                            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                        # Sadece her FRAME_SKIP_RATE. kare çözülür
+                        for frame_index, frame_time, frame in source:
+                            pose_image, pose_transform = resize_for_inference(frame, POSE_INFERENCE_SIZE,
+                                                                              INFERENCE_LETTERBOX)
+                            image_rgb = cv2.cvtColor(pose_image, cv2.COLOR_BGR2RGB)
                             results = pose.process(image_rgb)
+                            pose_transform.landmarks_to_source(results.pose_landmarks)
+                            recorder.add_frame(frame_index, frame_time,
+                                               persons=[(None, None, results.pose_landmarks)])
                             
                             if results.pose_landmarks:
                                 frame_keypoints = []
                                 for landmark in results.pose_landmarks.landmark:
                                     frame_keypoints.extend([landmark.x, landmark.y])
                                 video_keypoints_list.append(frame_keypoints)
-                        
-                        frame_count += 1
-                            
-                    cap.release()
+                                
+                        source.release()
+
+                    if USE_LANDMARK_CACHE:
+                        recorder.save(cache_file)
                     
-                    if video_keypoints_list:
-                        csv_output_filename = os.path.splitext(video_file)[0] + '.csv'
-                        csv_output_full_path = os.path.join(output_action_csv_path, csv_output_filename)
-                        
-                        df_keypoints = pd.DataFrame(video_keypoints_list)
-                        df_keypoints.to_csv(csv_output_full_path, index=False)
-                        print(f"    Keypointler kaydedildi: {csv_output_full_path}")
-                    else:
-                        print(f"    Uyarı: '{video_file}' videosundan keypoint çıkarılamadı veya boş. Atlanıyor.")
+                if video_keypoints_list:
+                    csv_output_filename = os.path.splitext(video_file)[0] + '.csv'
+                    csv_output_full_path = os.path.join(output_action_csv_path, csv_output_filename)
+                    
+                    df_keypoints = pd.DataFrame(video_keypoints_list)
+                    df_keypoints.to_csv(csv_output_full_path, index=False)
+                    print(f"    Keypointler kaydedildi: {csv_output_full_path}")
+                else:
+                    print(f"    Uyarı: '{video_file}' videosundan keypoint çıkarılamadı veya boş. Atlanıyor.")
 
 print("\n--- Tüm keypoint çıkarma ve CSV kaydetme tamamlandı! ---")
\ No newline at end of file
@@ -0,0 +1,202 @@
+# Bu modül, video karelerini kare atlama oranına göre okuyan ortak bir kaynak (FrameSource) sağlar.
+# Atlanan kareler sadece grab() ile geçilir (çözülmez), yalnızca örneklenen kareler retrieve() ile çözülür.
+# Böylece çözme maliyeti videonun kare hızıyla değil, örnekleme hızıyla orantılı olur.
+# İsteğe bağlı ffmpeg arka ucu, kareleri doğrudan küçük çözünürlüğe ölçekleyip birden çok iş parçacığıyla çözer.
+import shutil
+import subprocess
+import threading
+import queue
+import cv2
+import numpy as np
+
+DEFAULT_FPS = 30.0
+FFMPEG_THREADS = 4
+
+class FrameSource:
+    """
+    Video dosyası veya kameradan sadece örneklenen kareleri döndüren okuyucu.
+
+    Her iterasyon (frame_index, frame_time, frame) üçlüsü döndürür:
+    frame_index videodaki 0 tabanlı kare numarası, frame_time saniye cinsinden video zamanıdır.
+    first_sample'dan başlayarak her frame_skip_rate. kare örneklenir.
+    """
+    def __init__(self, source, frame_skip_rate=1, first_sample=0, start_time=None, end_time=None,
+                 backend='opencv', output_width=None, threads=FFMPEG_THREADS, prefetch=0):
+        self.source = source
+        self.frame_skip_rate = max(1, int(frame_skip_rate))
+        self.first_sample = first_sample
+        self.output_width = output_width
+        self.threads = threads
+        self.prefetch = prefetch
+        self.end_frame = None
+        self._process = None
+        self._next_index = 0
+
+        # Meta veriler (fps, boyut, kare sayısı) her durumda OpenCV ile okunur
+        self.cap = cv2.VideoCapture(source)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        is_file = isinstance(source, str)
+        if backend == 'ffmpeg' and not (is_file and shutil.which('ffmpeg')):
+            print("Uyarı: ffmpeg bulunamadı veya kaynak dosya değil, OpenCV arka ucu kullanılıyor.")
+            backend = 'opencv'
+        self.backend = backend
+
+        if end_time is not None:
+            self.end_frame = int(round(end_time * self.fps))
+        if start_time:
+            self.seek(start_time)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def seek(self, seconds):
+        """Okumayı verilen video zamanına (saniye) taşır."""
+        target_index = max(0, int(round(seconds * self.fps)))
+        if self.backend == 'opencv':
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target_index)
+            target_index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        else:
+            self._stop_ffmpeg()
+        self._next_index = target_index
+
+    def output_size(self):
+        """Döndürülen karelerin (genişlik, yükseklik) değeri"""
+        if not self.output_width or self.output_width >= self.width:
+            return self.width, self.height
+        out_h = int(round(self.height * self.output_width / self.width)) // 2 * 2
+        return self.output_width, out_h
+
+    def _is_sampled(self, frame_index):
+        offset = frame_index - self.first_sample
+        return offset >= 0 and offset % self.frame_skip_rate == 0
+
+    def _frames_opencv(self):
+        out_size = self.output_size()
+        while True:
+            frame_index = self._next_index
+            if self.end_frame is not None and frame_index >= self.end_frame:
+                return
+            # Atlanan karelerde sadece grab(): paket okunur ama görüntü çözülüp kopyalanmaz
+            if not self.cap.grab():
+                return
+            self._next_index += 1
+            if not self._is_sampled(frame_index):
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                return
+            if out_size != (self.width, self.height):
+                frame = cv2.resize(frame, out_size, interpolation=cv2.INTER_AREA)
+            yield frame_index, frame_index / self.fps, frame
+
+    def _start_ffmpeg(self):
+        out_w, out_h = self.output_size()
+        start_index = self._next_index
+        # select filtresi atlanan kareleri ölçeklemeden önce eler; n, -ss sonrası 0'dan başlar
+        offset = self.first_sample - start_index
+        select = f"select='gte(n\\,{offset})*not(mod(n-{offset}\\,{self.frame_skip_rate}))'"
+        filters = [select]
+        if (out_w, out_h) != (self.width, self.height):
+            filters.append(f"scale={out_w}:{out_h}:flags=area")
+        command = ['ffmpeg', '-loglevel', 'error', '-threads', str(self.threads)]
+        if start_index:
+            command += ['-ss', f"{start_index / self.fps:.6f}"]
+        command += ['-i', self.source, '-vf', ','.join(filters), '-vsync', '0',
+                    '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=out_w * out_h * 3 * 4)
+        return start_index
+
+    def _stop_ffmpeg(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def _read_into(self, frame):
+        view = memoryview(frame).cast('B')
+        received = 0
+        while received < len(view):
+            count = self._process.stdout.readinto(view[received:])
+            if not count:
+                return False
+            received += count
+        return True
+
+    def _frames_ffmpeg(self):
+        out_w, out_h = self.output_size()
+        frame_bytes = out_w * out_h * 3
+        start_index = self._start_ffmpeg()
+        # İlk örneklenen kare: start_index'ten büyük/eşit olan ilk örnek
+        frame_index = self.first_sample
+        if frame_index < start_index:
+            steps = -(-(start_index - frame_index) // self.frame_skip_rate)
+            frame_index += steps * self.frame_skip_rate
+        try:
+            while self.end_frame is None or frame_index < self.end_frame:
+                # Çizim yapılabilsin diye kare yazılabilir bir tampona okunur
+                frame = np.empty((out_h, out_w, 3), dtype=np.uint8)
+                if not self._read_into(frame):
+                    return
+                self._next_index = frame_index + 1
+                yield frame_index, frame_index / self.fps, frame
+                frame_index += self.frame_skip_rate
+        finally:
+            self._stop_ffmpeg()
+
+    def _frames(self):
+        if self.backend == 'ffmpeg':
+            return self._frames_ffmpeg()
+        return self._frames_opencv()
+
+    def _prefetched(self, frames):
+        """Kareleri arka plan iş parçacığında çözerek çıkarım ile çözmeyi üst üste bindirir"""
+        buffer = queue.Queue(maxsize=self.prefetch)
+        done = object()
+        stop = threading.Event()
+
+        def worker():
+            try:
+                for item in frames:
+                    if stop.is_set():
+                        return
+                    buffer.put(item)
+            finally:
+                buffer.put(done)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    return
+                yield item
+        finally:
+            stop.set()
+            # İş parçacığı kuyrukta beklemede kalmasın
+            while thread.is_alive():
+                try:
+                    buffer.get_nowait()
+                except queue.Empty:
+                    thread.join(0.01)
+
+    def __iter__(self):
+        frames = self._frames()
+        if self.prefetch > 0:
+            return self._prefetched(frames)
+        return frames
+
+    def release(self):
+        self._stop_ffmpeg()
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,79 @@
+# Bu modül, modellere (YOLO, MediaPipe) tam çözünürlüklü kare yerine küçültülmüş görüntü verilmesini sağlar.
+# Görüntü her aşama için bir kez küçültülür (isteğe bağlı letterbox ile kare tuvale yerleştirilir) ve
+# dönen FrameTransform ile kutular ve landmark'lar tam çözünürlüğe / orijinal normalize koordinatlara
+# birebir geri taşınır. Böylece yüksek çözünürlüklü kameralar fazladan piksellerin maliyetini ödemez.
+import cv2
+import numpy as np
+
+LETTERBOX_PAD_VALUE = 114  # YOLO'nun letterbox dolgusu ile aynı gri
+
+class FrameTransform:
+    """Çıkarım görüntüsü ile orijinal görüntü arasındaki ölçek ve dolgu bilgisi"""
+    __slots__ = ('src_w', 'src_h', 'dst_w', 'dst_h', 'scale_x', 'scale_y', 'pad_x', 'pad_y')
+
+    def __init__(self, src_w, src_h, dst_w, dst_h, scale_x=1.0, scale_y=1.0, pad_x=0, pad_y=0):
+        self.src_w = src_w
+        self.src_h = src_h
+        self.dst_w = dst_w
+        self.dst_h = dst_h
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+
+    @property
+    def is_identity(self):
+        return self.dst_w == self.src_w and self.dst_h == self.src_h and not (self.pad_x or self.pad_y)
+
+    def boxes_to_source(self, boxes):
+        """Çıkarım görüntüsündeki (N, 4) xyxy piksel kutularını orijinal görüntü piksellerine çevirir"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if self.is_identity:
+            return boxes
+        source_boxes = np.empty_like(boxes)
+        source_boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - self.pad_x) / self.scale_x, 0, self.src_w)
+        source_boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - self.pad_y) / self.scale_y, 0, self.src_h)
+        return source_boxes
+
+    def points_to_source(self, points):
+        """(N, >=2) normalize nokta dizisinin x, y sütunlarını orijinal görüntüye göre normalize eder (kopya döndürür)"""
+        points = np.array(points, dtype=np.float32)
+        if not self.is_identity:
+            points[:, 0] = (points[:, 0] * self.dst_w - self.pad_x) / self.scale_x / self.src_w
+            points[:, 1] = (points[:, 1] * self.dst_h - self.pad_y) / self.scale_y / self.src_h
+        return points
+
+    def landmarks_to_source(self, landmark_list):
+        """
+        Çıkarım görüntüsüne göre normalize edilmiş MediaPipe landmark'larını
+        orijinal görüntüye göre normalize koordinatlara (yerinde) çevirir.
+        """
+        if landmark_list is None or self.is_identity:
+            return landmark_list
+        for landmark in landmark_list.landmark:
+            landmark.x = (landmark.x * self.dst_w - self.pad_x) / self.scale_x / self.src_w
+            landmark.y = (landmark.y * self.dst_h - self.pad_y) / self.scale_y / self.src_h
+        return landmark_list
+
+def resize_for_inference(image, max_size, letterbox=False):
+    """
+    Görüntüyü uzun kenarı max_size olacak şekilde küçültür (büyütmez).
+    letterbox=True ise görüntü max_size x max_size gri tuvalin ortasına yerleştirilir.
+    (çıkarım görüntüsü, FrameTransform) döndürür.
+    """
+    h, w = image.shape[:2]
+    if not max_size or (max(h, w) <= max_size and not letterbox):
+        return image, FrameTransform(w, h, w, h)
+
+    scale = min(max_size / max(h, w), 1.0)
+    new_w = max(1, int(round(w * scale)))
+    new_h = max(1, int(round(h * scale)))
+    resized = image if scale == 1.0 else cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    if not letterbox:
+        return resized, FrameTransform(w, h, new_w, new_h, new_w / w, new_h / h)
+
+    canvas = np.full((max_size, max_size) + image.shape[2:], LETTERBOX_PAD_VALUE, dtype=image.dtype)
+    pad_x = (max_size - new_w) // 2
+    pad_y = (max_size - new_h) // 2
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return canvas, FrameTransform(w, h, max_size, max_size, new_w / w, new_h / h, pad_x, pad_y)
@@ -0,0 +1,216 @@
+# Bu modül, MediaPipe (ve YOLO takip) çıktılarını kare bazında sıkıştırılmış bir .npz dosyasına kaydeder.
+# Önbellek, videonun içerik özeti (SHA-1) ve model ayarları (model_complexity, güven eşikleri, kare atlama oranı...)
+# ile anahtarlanır. Aynı video aynı ayarlarla tekrar işlendiğinde modeller hiç çalıştırılmaz;
+# eşik ayarlama veya SEQUENCE_LENGTH denemeleri gibi sınıflandırıcı deneyleri önbellekten tekrar oynatılır.
+import hashlib
+import json
+import os
+import numpy as np
+
+CACHE_DIR = 'landmark_cache'
+CACHE_VERSION = 1              # Dosya formatı değişirse artırılmalı (eski önbellekler geçersiz olur)
+NUM_POSE_LANDMARKS = 33
+NUM_HAND_LANDMARKS = 21
+
+_video_hash_memo = {}
+
+def video_hash(video_path, chunk_size=1 << 20):
+    """Video dosyasının SHA-1 özetini hesaplar (aynı dosya için sonuç bellekte tutulur)."""
+    stat = os.stat(video_path)
+    memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime)
+    if memo_key not in _video_hash_memo:
+        sha = hashlib.sha1()
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha.update(chunk)
+        _video_hash_memo[memo_key] = sha.hexdigest()
+    return _video_hash_memo[memo_key]
+
+def cache_path(video_path, settings, cache_dir=CACHE_DIR):
+    """Video ve ayarlara karşılık gelen önbellek dosyasının yolunu döndürür (kamera için None)."""
+    if not isinstance(video_path, str) or not os.path.isfile(video_path):
+        return None
+    settings_json = json.dumps(settings, sort_keys=True)
+    key_source = f"{CACHE_VERSION}|{video_hash(video_path)}|{settings_json}"
+    key = hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:16]
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(cache_dir, f"{video_name}_{key}.npz")
+
+def landmarks_to_array(landmark_list):
+    """MediaPipe landmark listesini (N, 4) float32 diziye çevirir: x, y, z, visibility"""
+    return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in landmark_list.landmark], dtype=np.float32)
+
+def array_to_landmarks(landmark_array):
+    """(N, 3) veya (N, 4) diziyi MediaPipe NormalizedLandmarkList nesnesine çevirir."""
+    from mediapipe.framework.formats import landmark_pb2
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    has_visibility = landmark_array.shape[1] > 3
+    for row in landmark_array:
+        landmark = landmark_list.landmark.add(x=float(row[0]), y=float(row[1]), z=float(row[2]))
+        if has_visibility:
+            landmark.visibility = float(row[3])
+    return landmark_list
+
+class CachedPerson:
+    """Önbellekten okunan tek bir kişinin takip ID'si, kutusu ve poz landmark'ları"""
+    __slots__ = ('track_id', 'box', 'pose_array', '_pose_landmarks')
+
+    def __init__(self, track_id, box, pose_array):
+        self.track_id = track_id
+        self.box = box
+        self.pose_array = pose_array
+        self._pose_landmarks = None
+
+    @property
+    def pose_landmarks(self):
+        """Mevcut kodla uyumlu MediaPipe nesnesi (ilk erişimde oluşturulur)"""
+        if self._pose_landmarks is None:
+            self._pose_landmarks = array_to_landmarks(self.pose_array)
+        return self._pose_landmarks
+
+class CachedFrame:
+    """Önbellekteki tek bir örneklenmiş kare"""
+    __slots__ = ('frame_index', 'frame_time', 'persons', 'hand_arrays')
+
+    def __init__(self, frame_index, frame_time, persons, hand_arrays):
+        self.frame_index = frame_index
+        self.frame_time = frame_time
+        self.persons = persons
+        self.hand_arrays = hand_arrays
+
+    @property
+    def pose_landmarks(self):
+        """Tek kişilik betikler için ilk kişinin pozu (yoksa None)"""
+        return self.persons[0].pose_landmarks if self.persons else None
+
+    @property
+    def multi_hand_landmarks(self):
+        """mp.solutions.hands çıktısıyla aynı biçimde el landmark listesi (yoksa None)"""
+        if not self.hand_arrays:
+            return None
+        return [array_to_landmarks(hand) for hand in self.hand_arrays]
+
+class LandmarkRecorder:
+    """İşlenen karelerin landmark'larını toplar ve önbellek dosyasına yazar."""
+    def __init__(self, settings, fps=0.0):
+        self.settings = settings
+        self.fps = fps
+        self.frame_indices = []
+        self.frame_times = []
+        self.person_counts = []
+        self.person_ids = []
+        self.person_boxes = []
+        self.poses = []
+        self.hand_counts = []
+        self.hands = []
+
+    def add_frame(self, frame_index, frame_time, persons=(), hands=()):
+        """
+        Bir kareyi kaydeder.
+        persons: (track_id, box, pose_landmarks) üçlüleri; tek kişilik betiklerde track_id -1, box None olabilir.
+                 pose_landmarks MediaPipe nesnesi ya da (33, 4) dizi olabilir.
+        hands: MediaPipe el landmark listeleri.
+        """
+        self.frame_indices.append(frame_index)
+        self.frame_times.append(frame_time)
+
+        person_count = 0
+        for track_id, box, pose_landmarks in persons:
+            if pose_landmarks is None:
+                continue
+            self.person_ids.append(-1 if track_id is None else int(track_id))
+            self.person_boxes.append((0, 0, 0, 0) if box is None else tuple(int(v) for v in box))
+            if isinstance(pose_landmarks, np.ndarray):
+                self.poses.append(pose_landmarks.astype(np.float32))
+            else:
+                self.poses.append(landmarks_to_array(pose_landmarks))
+            person_count += 1
+        self.person_counts.append(person_count)
+
+        hand_count = 0
+        for hand_landmarks in hands or ():
+            self.hands.append(landmarks_to_array(hand_landmarks)[:, :3])
+            hand_count += 1
+        self.hand_counts.append(hand_count)
+
+    def save(self, path):
+        """Toplanan verileri sıkıştırılmış .npz dosyasına yazar."""
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        poses = np.stack(self.poses) if self.poses else np.zeros((0, NUM_POSE_LANDMARKS, 4), dtype=np.float32)
+        hands = np.stack(self.hands) if self.hands else np.zeros((0, NUM_HAND_LANDMARKS, 3), dtype=np.float32)
+        # Dosya yazımı yarıda kesilirse bozuk önbellek kalmasın diye önce geçici dosyaya yazılır
+        tmp_path = path + '.tmp.npz'
+        np.savez_compressed(
+            tmp_path,
+            version=np.int32(CACHE_VERSION),
+            settings=np.array(json.dumps(self.settings, sort_keys=True)),
+            fps=np.float32(self.fps),
+            frame_indices=np.asarray(self.frame_indices, dtype=np.int32),
+            frame_times=np.asarray(self.frame_times, dtype=np.float64),
+            person_offsets=np.concatenate(([0], np.cumsum(self.person_counts))).astype(np.int32),
+            person_ids=np.asarray(self.person_ids, dtype=np.int32),
+            person_boxes=np.asarray(self.person_boxes, dtype=np.int32).reshape(-1, 4),
+            poses=poses.astype(np.float32),
+            hand_offsets=np.concatenate(([0], np.cumsum(self.hand_counts))).astype(np.int32),
+            hands=hands.astype(np.float32),
+        )
+        os.replace(tmp_path, path)
+        print(f"Landmark önbelleği kaydedildi: {path} ({len(self.frame_indices)} kare)")
+
+class LandmarkRecording:
+    """Önbellek dosyasından okunan kayıt; karelerin sırayla tekrar oynatılmasını sağlar."""
+    def __init__(self, data):
+        self.settings = json.loads(str(data['settings']))
+        self.fps = float(data['fps'])
+        self.frame_indices = data['frame_indices']
+        self.frame_times = data['frame_times']
+        self.person_offsets = data['person_offsets']
+        self.person_ids = data['person_ids']
+        self.person_boxes = data['person_boxes']
+        self.poses = data['poses']
+        self.hand_offsets = data['hand_offsets']
+        self.hands = data['hands']
+
+    @classmethod
+    def load(cls, path):
+        """Önbellek dosyasını yükler; dosya yoksa veya sürümü uyumsuzsa None döndürür."""
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as npz:
+                if int(npz['version']) != CACHE_VERSION:
+                    return None
+                return cls({name: npz[name] for name in npz.files})
+        except Exception as e:
+            print(f"Landmark önbelleği okunamadı ({path}): {e}")
+            return None
+
+    def __len__(self):
+        return len(self.frame_indices)
+
+    def frame(self, i):
+        """i. kaydı CachedFrame olarak döndürür."""
+        p_start, p_end = self.person_offsets[i], self.person_offsets[i + 1]
+        h_start, h_end = self.hand_offsets[i], self.hand_offsets[i + 1]
+        persons = [
+            CachedPerson(None if self.person_ids[j] < 0 else int(self.person_ids[j]),
+                         self.person_boxes[j], self.poses[j])
+            for j in range(p_start, p_end)
+        ]
+        hand_arrays = [self.hands[j] for j in range(h_start, h_end)]
+        return CachedFrame(int(self.frame_indices[i]), float(self.frame_times[i]), persons, hand_arrays)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+def load_or_none(video_path, settings, cache_dir=CACHE_DIR):
+    """(önbellek yolu, kayıt) döndürür; önbellek yoksa kayıt None olur."""
+    path = cache_path(video_path, settings, cache_dir)
+    recording = LandmarkRecording.load(path)
+    if recording is not None:
+        print(f"Landmark önbelleği bulundu, modeller atlanıyor: {path}")
+    return path, recording
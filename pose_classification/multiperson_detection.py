@@ -4,15 +4,18 @@ import numpy as np
 import time
 import csv
 from ultralytics import YOLO
-from tensorflow.keras.models import load_model
 import joblib
 from collections import deque
 from mediapipe.framework.formats import landmark_pb2
+import landmark_cache
+from frame_source import FrameSource
+from inference_resolution import resize_for_inference
+from skeleton_renderer import SkeletonRenderer
+from video_writer import AsyncVideoWriter
+from crowd_analytics import CrowdAnalytics
 
 # --- MediaPipe ve YOLO Modelleri ---
 mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
 
 yolo_model = YOLO('yolov8n.pt') 
 
@@ -24,9 +27,56 @@ MIN_YOLO_CONFIDENCE = 0.5
 PERSON_CLASS_ID = 0
 FRAME_SKIP_RATE = 2 
 MAX_INVISIBLE_TIME = 1.0  # Tracker'ın kaybolması için geçen süre (saniye)
+DECODE_BACKEND = 'opencv'  # 'ffmpeg': kareler ayrı süreçte, çok iş parçacığıyla çözülür
+DECODE_PREFETCH = 4        # Arka planda önceden çözülecek örneklenmiş kare sayısı (0: kapalı)
+# Hareket kapısı: kişinin keypoint'leri son sınıflandırılan pencereden beri yeterince değişmediyse
+# model çalıştırılmaz, önceki tahmin ve güven tekrar kullanılır. Tahmin en fazla MAX_PREDICTION_STALENESS
+# saniye eski kalabilir, sonra hareket olmasa da yenilenir.
+MOTION_GATE_THRESHOLD = 0.02      # Vücut boyuna göre normalize ortalama eklem yer değiştirmesi
+MAX_PREDICTION_STALENESS = 2.0    # saniye
+CROP_PADDING = 10  # YOLO kutusunun pose için kırpılırken her yönden genişletileceği piksel
+# Aşama başına çıkarım çözünürlüğü (uzun kenar, piksel; None: tam çözünürlük).
+# Kare YOLO için bir kez küçültülür, kutular ve landmark'lar tam çözünürlüğe geri taşınır.
+DETECTION_INFERENCE_SIZE = 640  # yolov8n zaten 640 px ile çalışır
+POSE_INFERENCE_SIZE = 256       # MediaPipe pose kırpılmış kişiyi 256 px'e küçültür
+INFERENCE_LETTERBOX = False     # True: görüntüler kare tuvale yerleştirilir (en-boy oranı korunur)
+
+# İşaretlenmiş çıktı videosu (None: kaydedilmez). Kodlama arka planda yapılır, ana döngüyü bekletmez.
+OUTPUT_VIDEO_PATH = 'output/multiperson_annotated.mp4'
+OUTPUT_CODEC = 'mp4v'
+OUTPUT_WIDTH = None              # None: kare boyutu korunur
+OUTPUT_FRAME_DECIMATION = 1      # Her N. işlenen kare yazılır
+OUTPUT_QUEUE_SIZE = 64
+OUTPUT_BACKPRESSURE = 'block'    # Kuyruk doluysa 'block' (bekle) veya 'drop' (kareyi atla)
+
+# Kalabalık analitiği: anlık/benzersiz sayım, hareket doluluğu, kalma süresi ve yoğunluk ısı haritası
+ANALYTICS_SNAPSHOT_PATH = 'output/crowd_analytics.json'
+ANALYTICS_SNAPSHOT_INTERVAL = 10.0  # saniye
+# Kişinin ısı haritasındaki konumu kalçaların ortası alınır
+HIP_LANDMARKS = [mp_pose.PoseLandmark.LEFT_HIP, mp_pose.PoseLandmark.RIGHT_HIP]
+
+# Landmark önbelleği: aynı video aynı ayarlarla daha önce işlendiyse YOLO/ByteTrack ve MediaPipe çalıştırılmaz,
+# takip ve hareket tanıma önbellekteki kutu ve landmark'lar üzerinden pencere açılmadan yapılır.
+USE_LANDMARK_CACHE = True
+POSE_SETTINGS = {
+    'pipeline': 'multiperson_detection',
+    'yolo_model': 'yolov8n.pt',
+    'min_yolo_confidence': MIN_YOLO_CONFIDENCE,
+    'crop_padding': CROP_PADDING,
+    'detection_inference_size': DETECTION_INFERENCE_SIZE,
+    'pose_inference_size': POSE_INFERENCE_SIZE,
+    'inference_letterbox': INFERENCE_LETTERBOX,
+    'model_complexity': 1,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'frame_skip_rate': FRAME_SKIP_RATE,
+}
 
 def load_trained_model():
     """Eğitilmiş modeli ve label encoder'ı yükle"""
+    # TensorFlow sadece sınıflandırma yapan süreçte yüklenir; bu modülü içe aktaran
+    # segment_parallel / parameter_sweep işçileri her çekirdekte ayrı bir TensorFlow başlatmaz
+    from tensorflow.keras.models import load_model
     try:
         model = load_model('best_action_model.h5')
         label_encoder = joblib.load('label_encoder.pkl')
@@ -63,15 +113,6 @@ def append_to_csv_log(person_id, action, duration):
     except Exception as e:
         print(f"Log dosyasına yazarken hata: {e}")
 
-def extract_pose_keypoints(pose_landmarks):
-    """Pose landmark'larından keypoint'leri çıkar"""
-    if pose_landmarks and pose_landmarks.landmark:
-        keypoints = []
-        for landmark in pose_landmarks.landmark:
-            keypoints.extend([landmark.x, landmark.y])
-        return keypoints
-    return None
-
 def predict_action(model, label_encoder, keypoints_sequence):
     """Keypoint dizisinden hareket tahmini yap"""
     if len(keypoints_sequence) < SEQUENCE_LENGTH:
@@ -87,25 +128,71 @@ def predict_action(model, label_encoder, keypoints_sequence):
     
     return predicted_action, confidence
 
+# Hareket kapısı istatistikleri (model çağrısı / tekrar kullanılan tahmin sayısı)
+gating_stats = {'classified': 0, 'skipped': 0}
+
+def window_motion(window, reference_window):
+    """
+    İki keypoint penceresi arasındaki ortalama eklem yer değiştirmesini,
+    referans penceredeki vücut boyutuna (keypoint kutusunun köşegeni) bölerek döndürür.
+    """
+    joints = window.reshape(len(window), -1, 2)
+    reference_joints = reference_window.reshape(len(reference_window), -1, 2)
+    displacement = np.linalg.norm(joints - reference_joints, axis=2).mean()
+    extent = reference_joints.max(axis=1) - reference_joints.min(axis=1)
+    body_size = np.linalg.norm(extent, axis=1).mean()
+    return displacement / max(body_size, 1e-6)
+
+def print_gating_stats():
+    """Hareket kapısının atladığı sınıflandırıcı çağrılarının oranını yazdırır"""
+    total = gating_stats['classified'] + gating_stats['skipped']
+    if total:
+        print(f"Sınıflandırıcı: {gating_stats['classified']} çağrı, {gating_stats['skipped']} atlandı "
+              f"(atlama oranı: %{100.0 * gating_stats['skipped'] / total:.1f})")
+
 class PersonTracker:
-    """Tek bir kişiye ait takip bilgilerini tutar"""
-    def __init__(self, track_id, initial_pose_landmarks, initial_frame_time):
+    """
+    Tek bir kişiye ait takip bilgilerini tutar.
+    Pozlar MediaPipe nesnesi yerine (33, 4) float32 dizi (x, y, z, visibility) olarak saklanır.
+    """
+    __slots__ = ('id', 'keypoints_history', 'last_predicted_action', 'last_action_start_time',
+                 'current_action_duration', 'last_pose', 'last_update_time',
+                 'cached_prediction', 'last_classified_window', 'last_classified_time')
+
+    def __init__(self, track_id, initial_pose, initial_frame_time):
         self.id = track_id
         self.keypoints_history = deque(maxlen=SEQUENCE_LENGTH * 2)
         self.last_predicted_action = "Unknown"
         self.last_action_start_time = initial_frame_time
         self.current_action_duration = 0.0
-        self.last_pose_landmarks = initial_pose_landmarks
+        self.last_pose = initial_pose
         self.last_update_time = initial_frame_time
+        self.cached_prediction = None
+        self.last_classified_window = None
+        self.last_classified_time = initial_frame_time
+
+    def classify(self, frame_time, model, label_encoder):
+        """Hareket eşiğin altındaysa önceki tahmini tekrar kullanır, değilse modeli çalıştırır"""
+        window = np.stack(list(self.keypoints_history)[-SEQUENCE_LENGTH:])
+        if (self.cached_prediction is not None
+                and frame_time - self.last_classified_time < MAX_PREDICTION_STALENESS
+                and window_motion(window, self.last_classified_window) < MOTION_GATE_THRESHOLD):
+            gating_stats['skipped'] += 1
+            return self.cached_prediction
+
+        gating_stats['classified'] += 1
+        self.cached_prediction = predict_action(model, label_encoder, window)
+        self.last_classified_window = window
+        self.last_classified_time = frame_time
+        return self.cached_prediction
         
-    def update(self, new_pose_landmarks, frame_time, model, label_encoder):
+    def update(self, new_pose, frame_time, model, label_encoder):
         """Tracker'ı yeni poz bilgisiyle güncelle ve hareket tahmini yap"""
-        keypoints = extract_pose_keypoints(new_pose_landmarks)
-        if keypoints:
-            self.keypoints_history.append(keypoints)
+        # Model girdisi: 33 landmark'ın x, y değerleri (66 eleman)
+        self.keypoints_history.append(new_pose[:, :2].reshape(-1))
         
         if len(self.keypoints_history) >= SEQUENCE_LENGTH:
-            predicted_action, confidence = predict_action(model, label_encoder, list(self.keypoints_history))
+            predicted_action, confidence = self.classify(frame_time, model, label_encoder)
             
             if confidence > MIN_CONFIDENCE_THRESHOLD:
                 if predicted_action != self.last_predicted_action:
@@ -122,10 +209,131 @@ class PersonTracker:
                 self.last_predicted_action = "Unknown"
                 self.current_action_duration = 0.0
             
-        self.last_pose_landmarks = new_pose_landmarks
+        self.last_pose = new_pose
         self.last_update_time = frame_time
         return self.last_predicted_action, self.current_action_duration
 
+def update_person_tracker(person_trackers, track_id, pose, frame_time, model, label_encoder):
+    """Kişinin tracker'ını oluşturur ya da yeni poz dizisiyle günceller"""
+    if track_id not in person_trackers:
+        person_trackers[track_id] = PersonTracker(track_id, pose, frame_time)
+    else:
+        person_trackers[track_id].update(pose, frame_time, model, label_encoder)
+
+def expire_trackers(person_trackers, frame_time):
+    """Uzun süredir görülmeyen tracker'ların son eylemini loglar ve kalan tracker'ları döndürür"""
+    trackers_to_keep = {}
+    for tracker_id, tracker in person_trackers.items():
+        if (frame_time - tracker.last_update_time) < MAX_INVISIBLE_TIME:
+            trackers_to_keep[tracker_id] = tracker
+        else:
+            # Bir tracker kalıcı olarak kaybolduysa son eylemini logla
+            if tracker.last_predicted_action != "Unknown":
+                 append_to_csv_log(tracker_id, tracker.last_predicted_action, tracker.current_action_duration)
+    return trackers_to_keep
+
+def flush_trackers(person_trackers):
+    """Tüm aktif tracker'ların son eylemini loglar (video sonu veya çıkış)"""
+    for tracker_id, tracker in person_trackers.items():
+        if tracker.last_predicted_action != "Unknown":
+            append_to_csv_log(tracker_id, tracker.last_predicted_action, tracker.current_action_duration)
+
+def create_crowd_analytics(frame_size=None):
+    """Ayarlara göre kalabalık analitiği nesnesi oluşturur"""
+    return CrowdAnalytics(frame_size=frame_size, snapshot_path=ANALYTICS_SNAPSHOT_PATH,
+                          snapshot_interval=ANALYTICS_SNAPSHOT_INTERVAL)
+
+def update_crowd_analytics(analytics, person_trackers, frame_time):
+    """Aktif tracker'ları kalabalık analitiğine aktarır"""
+    analytics.update(frame_time, [
+        (tracker_id, tracker.last_predicted_action, tracker.last_pose[HIP_LANDMARKS, :2].mean(axis=0))
+        for tracker_id, tracker in person_trackers.items()])
+
+def finish_crowd_analytics(analytics):
+    """Son analitik özetini diske yazar ve yazdırır"""
+    if ANALYTICS_SNAPSHOT_PATH:
+        analytics.save_snapshot()
+        print(f"Kalabalık analitiği kaydedildi: {ANALYTICS_SNAPSHOT_PATH}")
+    print(f"Toplam benzersiz kişi: {analytics.unique_count}, en yüksek anlık sayı: {analytics.peak_count}")
+
+def replay_from_cache(recording, model, label_encoder):
+    """Önbellekteki kutu ve landmark'lar üzerinden, video çözmeden ve pencere açmadan hareket tanıma yapar"""
+    start_time = time.time()
+    person_trackers = {}
+    analytics = create_crowd_analytics()
+    video_time = 0.0
+    for cached in recording:
+        video_time = cached.frame_time
+        for person in cached.persons:
+            update_person_tracker(person_trackers, person.track_id, person.pose_array,
+                                  video_time, model, label_encoder)
+        person_trackers = expire_trackers(person_trackers, video_time)
+        update_crowd_analytics(analytics, person_trackers, video_time)
+    flush_trackers(person_trackers)
+    finish_crowd_analytics(analytics)
+    print(f"Önbellekten {len(recording)} kare {time.time() - start_time:.2f} saniyede işlendi "
+          f"(video süresi: {video_time:.1f}s)")
+    print_gating_stats()
+
+def reset_tracker():
+    """
+    ByteTrack durumunu yeni bir video veya dilim için sıfırlar. Tahminci yeniden oluşturulmaz: predictor None
+    yapılırsa Model.track() takip geri çağrılarını tekrar kaydeder ve her karede takipçi birden çok kez güncellenir.
+    """
+    for tracker in getattr(yolo_model.predictor, 'trackers', None) or ():
+        tracker.reset()
+
+def detect_persons(frame, pose, min_yolo_confidence=MIN_YOLO_CONFIDENCE, crop_padding=CROP_PADDING):
+    """
+    Karedeki kişileri YOLO + ByteTrack ile takip eder ve her kişinin kırpılmış görüntüsünde pozu çıkarır.
+    (track_id, box, poz dizisi) listesini döndürür; kutular tam çözünürlüklü piksel, pozlar kareye göre normalize.
+    min_yolo_confidence / crop_padding: parametre taraması için sabitlerin yerine kullanılacak değerler.
+    """
+    h, w, _ = frame.shape
+    detection_image, detection_transform = resize_for_inference(frame, DETECTION_INFERENCE_SIZE, INFERENCE_LETTERBOX)
+    yolo_kwargs = {'imgsz': DETECTION_INFERENCE_SIZE} if DETECTION_INFERENCE_SIZE else {}
+    yolo_results = yolo_model.track(detection_image, persist=True, classes=PERSON_CLASS_ID, conf=min_yolo_confidence,
+                                    verbose=False, **yolo_kwargs)
+    
+    detected_ids_this_frame = set()
+    cached_persons = []
+
+    if yolo_results and yolo_results[0].boxes.id is not None:
+        # Kutular küçültülmüş görüntüden tam çözünürlüklü kareye taşınır
+        boxes = detection_transform.boxes_to_source(yolo_results[0].boxes.xyxy.cpu().numpy()).astype(int)
+        ids = yolo_results[0].boxes.id.cpu().numpy().astype(int)
+        
+        for box, track_id in zip(boxes, ids):
+            detected_ids_this_frame.add(track_id)
+            x1, y1, x2, y2 = box
+            
+            padding = crop_padding
+            x1_pad = max(0, x1 - padding)
+            y1_pad = max(0, y1 - padding)
+            x2_pad = min(w, x2 + padding)
+            y2_pad = min(h, y2 + padding)
+            
+            cropped_img = frame[y1_pad:y2_pad, x1_pad:x2_pad]
+            
+            if cropped_img.size == 0:
+                continue
+                
+            # Kırpılan kişi tam çözünürlükten alınır, pose için bir kez küçültülür
+            pose_image, pose_transform = resize_for_inference(cropped_img, POSE_INFERENCE_SIZE, INFERENCE_LETTERBOX)
+            cropped_img_rgb = cv2.cvtColor(pose_image, cv2.COLOR_BGR2RGB)
+            pose_results = pose.process(cropped_img_rgb)
+            
+            if pose_results.pose_landmarks:
+                # Kırpıntıya göre normalize landmark'lar tam kareye göre normalize edilir
+                person_pose = pose_transform.points_to_source(
+                    landmark_cache.landmarks_to_array(pose_results.pose_landmarks))
+                person_pose[:, 0] = (person_pose[:, 0] * (x2_pad - x1_pad) + x1_pad) / w
+                person_pose[:, 1] = (person_pose[:, 1] * (y2_pad - y1_pad) + y1_pad) / h
+                    
+                cached_persons.append((track_id, box, person_pose))
+
+    return cached_persons
+
 def main():
     model, label_encoder = load_trained_model()
     if model is None:
@@ -133,124 +341,94 @@ def main():
         return
 
     setup_log_file()
+
+    cache_file, recording = (landmark_cache.load_or_none(VIDEO_SOURCE, POSE_SETTINGS)
+                             if USE_LANDMARK_CACHE else (None, None))
+    if recording is not None:
+        replay_from_cache(recording, model, label_encoder)
+        return
     
-    cap = cv2.VideoCapture(VIDEO_SOURCE)
+    # Sadece her FRAME_SKIP_RATE. kare çözülür; aradaki kareler grab() ile atlanır
+    source = FrameSource(VIDEO_SOURCE, frame_skip_rate=FRAME_SKIP_RATE, first_sample=FRAME_SKIP_RATE - 1,
+                         backend=DECODE_BACKEND, prefetch=DECODE_PREFETCH)
     
-    if not cap.isOpened():
+    if not source.is_opened():
         print(f"Video kaynağı açılamadı: {VIDEO_SOURCE}")
         return
 
+    recorder = landmark_cache.LandmarkRecorder(POSE_SETTINGS, source.fps)
+    reached_end = False
+    output_writer = None
+    if OUTPUT_VIDEO_PATH:
+        # Sadece örneklenen kareler gösterildiği için çıktı fps'i kare atlama oranına bölünür
+        output_writer = AsyncVideoWriter(OUTPUT_VIDEO_PATH, source.fps / FRAME_SKIP_RATE, codec=OUTPUT_CODEC,
+                                         output_width=OUTPUT_WIDTH, frame_decimation=OUTPUT_FRAME_DECIMATION,
+                                         queue_size=OUTPUT_QUEUE_SIZE, backpressure=OUTPUT_BACKPRESSURE)
+
     print("YOLO, ByteTrack ve Hareket Tanıma entegrasyonu başlatıldı...")
     print("Çıkış için ESC tuşuna basın")
     
     person_trackers = {}
-    frame_count = 0
+    skeleton_renderer = SkeletonRenderer()
+    analytics = create_crowd_analytics((source.width, source.height))
     
     with mp_pose.Pose(
         static_image_mode=False,
-        model_complexity=1,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5) as pose:
+        model_complexity=POSE_SETTINGS['model_complexity'],
+        min_detection_confidence=POSE_SETTINGS['min_detection_confidence'],
+        min_tracking_confidence=POSE_SETTINGS['min_tracking_confidence']) as pose:
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                # Video bittiğinde tüm aktif tracker'ları logla
-                for tracker_id, tracker in person_trackers.items():
-                    if tracker.last_predicted_action != "Unknown":
-                        append_to_csv_log(tracker_id, tracker.last_predicted_action, tracker.current_action_duration)
-                break
-            
+        for frame_index, video_time, frame in source:
             h, w, _ = frame.shape
-            frame_count += 1
-            frame_time = time.time()
             
-            # Kare atlama mantığı ile performansı artırma
-            if frame_count % FRAME_SKIP_RATE == 0:
-                yolo_results = yolo_model.track(frame, persist=True, classes=PERSON_CLASS_ID, conf=MIN_YOLO_CONFIDENCE, verbose=False)
-                
-                detected_ids_this_frame = set()
-
-                if yolo_results and yolo_results[0].boxes.id is not None:
-                    boxes = yolo_results[0].boxes.xyxy.cpu().numpy().astype(int)
-                    ids = yolo_results[0].boxes.id.cpu().numpy().astype(int)
-                    
-                    for box, track_id in zip(boxes, ids):
-                        detected_ids_this_frame.add(track_id)
-                        x1, y1, x2, y2 = box
-                        
-                        padding = 10 
-                        x1_pad = max(0, x1 - padding)
-                        y1_pad = max(0, y1 - padding)
-                        x2_pad = min(w, x2 + padding)
-                        y2_pad = min(h, y2 + padding)
-                        
-                        cropped_img = frame[y1_pad:y2_pad, x1_pad:x2_pad]
-                        
-                        if cropped_img.size == 0:
-                            continue
-                            
-                        cropped_img_rgb = cv2.cvtColor(cropped_img, cv2.COLOR_BGR2RGB)
-                        pose_results = pose.process(cropped_img_rgb)
-                        
-                        if pose_results.pose_landmarks:
-                            adjusted_landmarks = pose_results.pose_landmarks
-                            for landmark in adjusted_landmarks.landmark:
-                                landmark.x = (landmark.x * (x2_pad - x1_pad) + x1_pad) / w
-                                landmark.y = (landmark.y * (y2_pad - y1_pad) + y1_pad) / h
-                                
-                            if track_id not in person_trackers:
-                                person_trackers[track_id] = PersonTracker(track_id, adjusted_landmarks, frame_time)
-                            else:
-                                person_trackers[track_id].update(adjusted_landmarks, frame_time, model, label_encoder)
+            # Takip, hareket kapısı, kaybolma süresi ve analitik gerçek saat yerine video zamanıyla beslenir;
+            # böylece işlem hızından bağımsızdır ve önbellekten tekrar oynatma aynı sonucu verir
+            cached_persons = detect_persons(frame, pose)
+            for track_id, box, person_pose in cached_persons:
+                update_person_tracker(person_trackers, track_id, person_pose, video_time, model, label_encoder)
+            recorder.add_frame(frame_index, video_time, persons=cached_persons)
 
             # --- Tracker Yönetimi ve Çizimler ---
+            person_trackers = expire_trackers(person_trackers, video_time)
+            update_crowd_analytics(analytics, person_trackers, video_time)
+            # Tüm iskeletler ve kutular toplu çizilir
+            skeleton_renderer.draw(frame, [tracker.last_pose for tracker in person_trackers.values()],
+                                   labels=[f'ID: {tracker_id}' for tracker_id in person_trackers])
+
+            cv2.putText(frame, f"Anlik: {analytics.current_count} | Toplam: {analytics.unique_count}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2, cv2.LINE_AA)
+
+            # Ekranın kenarına eylem bilgilerini yaz
             y_offset = 30
-            trackers_to_keep = {}
             for tracker_id, tracker in person_trackers.items():
-                if (frame_time - tracker.last_update_time) < MAX_INVISIBLE_TIME:
-                    trackers_to_keep[tracker_id] = tracker
-                    
-                    # bounding box ve metinleri çiz
-                    x_coords = [lm.x * w for lm in tracker.last_pose_landmarks.landmark]
-                    y_coords = [lm.y * h for lm in tracker.last_pose_landmarks.landmark]
-                    if x_coords and y_coords:
-                        x1, y1 = int(min(x_coords)), int(min(y_coords))
-                        x2, y2 = int(max(x_coords)), int(max(y_coords))
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                        
-                        text = f'ID: {tracker_id}'
-                        cv2.putText(frame, text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
-                        
-                        mp_drawing.draw_landmarks(
-                            frame,
-                            tracker.last_pose_landmarks,
-                            mp_pose.POSE_CONNECTIONS,
-                            landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style())
-                    
-                    # Ekranın kenarına eylem bilgilerini yaz
-                    action_text = f"ID:{tracker_id} | {tracker.last_predicted_action} | {tracker.current_action_duration:.1f}s"
-                    cv2.putText(frame, action_text, (w - 300, y_offset),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
-                    y_offset += 30
-                else:
-                    # Bir tracker kalıcı olarak kaybolduysa son eylemini logla
-                    if tracker.last_predicted_action != "Unknown":
-                         append_to_csv_log(tracker_id, tracker.last_predicted_action, tracker.current_action_duration)
-            
-            person_trackers = trackers_to_keep
+                action_text = f"ID:{tracker_id} | {tracker.last_predicted_action} | {tracker.current_action_duration:.1f}s"
+                cv2.putText(frame, action_text, (w - 300, y_offset),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+                y_offset += 30
             
             cv2.imshow('YOLO + ByteTrack + MediaPipe + Action Recognition', frame)
+            if output_writer:
+                output_writer.write(frame)
 
             if cv2.waitKey(1) & 0xFF == 27:
                 # Çıkışta tüm aktif tracker'ları logla
-                for tracker_id, tracker in person_trackers.items():
-                    if tracker.last_predicted_action != "Unknown":
-                        append_to_csv_log(tracker_id, tracker.last_predicted_action, tracker.current_action_duration)
+                flush_trackers(person_trackers)
                 break
+        else:
+            # Video bittiğinde tüm aktif tracker'ları logla
+            flush_trackers(person_trackers)
+            reached_end = True
     
-    cap.release()
+    source.release()
+    if output_writer:
+        output_writer.close()
     cv2.destroyAllWindows()
+    finish_crowd_analytics(analytics)
+    print_gating_stats()
+
+    # Önbellek sadece video sonuna kadar işlendiyse yazılır (yarım kayıt tekrar oynatılmasın)
+    if USE_LANDMARK_CACHE and reached_end:
+        recorder.save(cache_file)
     print("Program sonlandırıldı.")
 
 if __name__ == "__main__":
@@ -0,0 +1,356 @@
+# Bu betik, elle ayarlanan parametrelerin (FRAME_SKIP_RATE, SEQUENCE_LENGTH, model_complexity,
+# MIN_YOLO_CONFIDENCE, CROP_PADDING) hız ve doğruluk etkisini etiketli klipler üzerinde ölçer.
+# Tarama iki aşamalıdır:
+#   1. Algılama: landmark'ları etkileyen her ayar (kare atlama, model_complexity, YOLO eşiği, kırpma dolgusu)
+#      ve klip için YOLO + ByteTrack + MediaPipe ayrı süreçlerde paralel çalıştırılır. Sonuçlar landmark
+#      önbelleğine yazılır; multiperson_detection.py ile aynı anahtar kullanıldığı için daha önce işlenmiş
+#      videolar ve önceki taramalar tekrar çalıştırılmaz.
+#      Hız ölçümü bundan ayrı, yarışmasız bir geçişte yapılır: her ayar zamanlama klibinin ilk TIMING_FRAMES
+#      karesinde tek bir işçiyle çalıştırılır. Böylece ölçümler paralel süreçlerin birbirini yavaşlatmasından
+#      etkilenmez ve sonraki taramalarda tekrar kullanılabilir.
+#   2. Sınıflandırma: her SEQUENCE_LENGTH için pencereler önbellekteki pozlardan oluşturulur, tek toplu
+#      model.predict ile sınıflandırılır ve klip etiketiyle karşılaştırılır.
+# Her ayar için işlem hızı (gerçek zaman katı), kare gecikmesi, tepki süresi ve etiket uyumu raporlanır;
+# hiçbir ölçütte diğerinden geri kalmayan ayarlar (Pareto sınırı) ayrıca listelenir.
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+import mediapipe as mp
+import landmark_cache
+import multiperson_detection as mpd
+from frame_source import FrameSource
+from segment_parallel import init_worker
+
+mp_pose = mp.solutions.pose
+
+# --- Parametreler ---
+# Etiketli klipler: extract_keypoints_from_videos.py ile aynı düzen, her hareket için bir alt klasör
+# (örn. sweep_clips/Clapping/*.mp4). Klasör adları label_encoder sınıflarıyla aynı olmalı.
+SWEEP_CLIP_ROOT = 'sweep_clips'
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+PARAMETER_GRID = {
+    'frame_skip_rate': [1, 2, 5],
+    'sequence_length': [10, 15],
+    'model_complexity': [0, 1],
+    'min_yolo_confidence': [0.3, 0.5],
+    'crop_padding': [10, 30],
+}
+# Landmark'ları değiştiren parametreler; geri kalanlar sadece sınıflandırmayı etkiler
+PERCEPTION_PARAMETERS = ('frame_skip_rate', 'model_complexity', 'min_yolo_confidence', 'crop_padding')
+NUM_WORKERS = os.cpu_count() or 1
+CLASSIFIER_LATENCY_SAMPLES = 20  # Tek pencerelik model çağrısı gecikmesi bu kadar ölçümün medyanıdır
+TIMING_CLIP = None               # Hız ölçümünde kullanılacak video (None: ilk etiketli klip)
+TIMING_FRAMES = 300              # Hız ölçümünde her ayar için işlenecek örneklenmiş kare sayısı
+# Hız ölçümleri önbelleğin yanında tutulur; önbellekten gelen ayarların hızı da raporlanabilsin
+TIMINGS_PATH = os.path.join(landmark_cache.CACHE_DIR, 'sweep_timings.json')
+REPORT_CSV_PATH = 'output/parameter_sweep.csv'
+REPORT_JSON_PATH = 'output/parameter_sweep_pareto.json'
+# Pareto sınırı için ölçütler ve yönleri
+PARETO_OBJECTIVES = {
+    'agreement': 'max',
+    'realtime_factor': 'max',
+    'latency_p95_ms': 'min',
+}
+
+def find_labeled_clips(root):
+    """(video yolu, etiket) listesini döndürür; etiket videonun bulunduğu alt klasörün adıdır."""
+    if not os.path.isdir(root):
+        print(f"Hata: Klip klasörü '{root}' bulunamadı.")
+        return []
+    clips = []
+    for label in sorted(os.listdir(root)):
+        label_dir = os.path.join(root, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for video_file in sorted(os.listdir(label_dir)):
+            if video_file.lower().endswith(VIDEO_EXTENSIONS):
+                clips.append((os.path.join(label_dir, video_file), label))
+    return clips
+
+def perception_settings(perception):
+    """Algılama ayarlarını multiperson_detection'ın önbellek anahtarıyla aynı biçimde döndürür"""
+    return dict(mpd.POSE_SETTINGS, **perception)
+
+def open_perception(video_path, perception):
+    """Ayara göre örnekleyen kare kaynağını ve MediaPipe pose modelini hazırlar"""
+    # ByteTrack durumu önceki klipten taşınmasın diye takipçi yerinde sıfırlanır. Tahminci yeniden
+    # oluşturulsaydı takip geri çağrıları birikir, sırayla ölçülen her ayar bir öncekinden yavaş görünürdü.
+    mpd.reset_tracker()
+    frame_skip_rate = perception['frame_skip_rate']
+    source = FrameSource(video_path, frame_skip_rate=frame_skip_rate, first_sample=frame_skip_rate - 1,
+                         backend=mpd.DECODE_BACKEND)
+    pose = mp_pose.Pose(
+        static_image_mode=False,
+        model_complexity=perception['model_complexity'],
+        min_detection_confidence=mpd.POSE_SETTINGS['min_detection_confidence'],
+        min_tracking_confidence=mpd.POSE_SETTINGS['min_tracking_confidence'])
+    return source, pose
+
+def run_perception(task):
+    """Klibi verilen algılama ayarlarıyla işler ve landmark önbelleğine yazar; başarılıysa True döndürür."""
+    video_path, perception = task
+    source, pose = open_perception(video_path, perception)
+    if not source.is_opened():
+        pose.close()
+        return video_path, perception, False
+
+    settings = perception_settings(perception)
+    recorder = landmark_cache.LandmarkRecorder(settings, source.fps)
+    with pose:
+        for frame_index, video_time, frame in source:
+            persons = mpd.detect_persons(frame, pose, perception['min_yolo_confidence'], perception['crop_padding'])
+            recorder.add_frame(frame_index, video_time, persons=persons)
+    source.release()
+    recorder.save(landmark_cache.cache_path(video_path, settings))
+    return video_path, perception, True
+
+def run_timing(task):
+    """
+    Algılama ayarının hızını zamanlama klibinin ilk TIMING_FRAMES örneklenmiş karesinde ölçer.
+    Kare gecikmeleri sadece tespit + pozu, toplam süre video çözmeyi de kapsar.
+    """
+    video_path, perception = task
+    source, pose = open_perception(video_path, perception)
+    if not source.is_opened():
+        pose.close()
+        return perception, None
+
+    latencies = []
+    start_time = time.perf_counter()
+    with pose:
+        for _, _, frame in source:
+            frame_start = time.perf_counter()
+            mpd.detect_persons(frame, pose, perception['min_yolo_confidence'], perception['crop_padding'])
+            latencies.append(time.perf_counter() - frame_start)
+            if len(latencies) >= TIMING_FRAMES:
+                break
+    elapsed = time.perf_counter() - start_time
+    source.release()
+    if not latencies:
+        return perception, None
+    return perception, {'latencies': latencies, 'wall_seconds': elapsed}
+
+def timing_key(timing_clip, perception):
+    """Hız ölçümünün anahtarı: zamanlama klibi ve ayarlar (landmark önbelleği anahtarı) ile kare sayısı"""
+    cache_file = landmark_cache.cache_path(timing_clip, perception_settings(perception))
+    return f"{os.path.basename(cache_file)}|{TIMING_FRAMES}"
+
+def load_timings():
+    try:
+        with open(TIMINGS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_timings(timings):
+    os.makedirs(os.path.dirname(TIMINGS_PATH) or '.', exist_ok=True)
+    with open(TIMINGS_PATH, 'w') as f:
+        json.dump(timings, f, indent=4)
+
+def track_windows(recording, sequence_length):
+    """
+    Kayıttaki her takip için PersonTracker ile aynı şekilde pencere oluşturur: takip MAX_INVISIBLE_TIME'dan
+    uzun kaybolursa geçmiş sıfırlanır, ilk poz geçmişe eklenmez. (pencere sayısı, L, 66) dizi döndürür.
+    """
+    histories = {}
+    windows = []
+    for cached in recording:
+        for person in cached.persons:
+            history = histories.get(person.track_id)
+            if history is None or cached.frame_time - history['last_time'] >= mpd.MAX_INVISIBLE_TIME:
+                histories[person.track_id] = {'poses': [], 'last_time': cached.frame_time}
+                continue
+            history['poses'].append(person.pose_array[:, :2].reshape(-1))
+            history['last_time'] = cached.frame_time
+            if len(history['poses']) >= sequence_length:
+                windows.append(history['poses'][-sequence_length:])
+                del history['poses'][:-sequence_length]
+    if not windows:
+        return np.zeros((0, sequence_length, landmark_cache.NUM_POSE_LANDMARKS * 2), dtype=np.float32)
+    return np.asarray(windows, dtype=np.float32)
+
+def classify_windows(model, label_encoder, windows):
+    """Pencereleri tek toplu çağrıda sınıflandırır; düşük güvenli tahminler 'Unknown' olur."""
+    if not len(windows):
+        return []
+    predictions = model.predict(windows, verbose=0)
+    class_indices = predictions.argmax(axis=1)
+    labels = label_encoder.inverse_transform(class_indices)
+    confidences = predictions[np.arange(len(predictions)), class_indices]
+    return [label if confidence > mpd.MIN_CONFIDENCE_THRESHOLD else "Unknown"
+            for label, confidence in zip(labels, confidences)]
+
+def usable_sequence_lengths(model, sequence_lengths):
+    """
+    Modelin gerçekten çalıştırabildiği pencere uzunluklarını döndürür (her uzunluk bir çağrıyla denenir).
+    Hiçbiri çalışmazsa modelin giriş uzunluğuna dönülür.
+    """
+    usable = []
+    for sequence_length in sequence_lengths:
+        window = np.zeros((1, sequence_length, landmark_cache.NUM_POSE_LANDMARKS * 2), dtype=np.float32)
+        try:
+            model.predict(window, verbose=0)
+            usable.append(sequence_length)
+        except Exception as e:
+            print(f"Uyarı: Model SEQUENCE_LENGTH={sequence_length} pencerelerini çalıştıramadı, atlanıyor: {e}")
+    model_length = model.input_shape[1]
+    if not usable and model_length:
+        print(f"Uyarı: Izgaradaki SEQUENCE_LENGTH değerlerinin ({list(sequence_lengths)}) hiçbiri çalışmadı, "
+              f"tarama modelin giriş uzunluğuyla (SEQUENCE_LENGTH={model_length}) yapılıyor.")
+        usable.append(model_length)
+    return usable
+
+def measure_classifier_latency(model, sequence_length):
+    """Canlı döngüdeki gibi tek pencerelik model çağrısının medyan süresini (saniye) ölçer"""
+    window = np.zeros((1, sequence_length, landmark_cache.NUM_POSE_LANDMARKS * 2), dtype=np.float32)
+    model.predict(window, verbose=0)  # İlk çağrı ısınma
+    durations = []
+    for _ in range(CLASSIFIER_LATENCY_SAMPLES):
+        start = time.perf_counter()
+        model.predict(window, verbose=0)
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+def pareto_frontier(results, objectives=PARETO_OBJECTIVES):
+    """Başka hiçbir sonuç tarafından geride bırakılmayan (domine edilmeyen) sonuçları döndürür"""
+    def dominates(a, b):
+        strictly_better = False
+        for key, direction in objectives.items():
+            better, worse = (a[key], b[key]) if direction == 'max' else (b[key], a[key])
+            if better < worse:
+                return False
+            if better > worse:
+                strictly_better = True
+        return strictly_better
+    return [result for result in results if not any(dominates(other, result) for other in results)]
+
+def write_report(results, frontier):
+    os.makedirs(os.path.dirname(REPORT_CSV_PATH) or '.', exist_ok=True)
+    frontier_ids = {id(result) for result in frontier}
+    with open(REPORT_CSV_PATH, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=list(results[0]) + ['pareto'])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(dict(result, pareto=id(result) in frontier_ids))
+    with open(REPORT_JSON_PATH, 'w') as f:
+        json.dump({'objectives': PARETO_OBJECTIVES, 'pareto_frontier': frontier}, f, indent=4)
+    print(f"Tüm sonuçlar: {REPORT_CSV_PATH}, Pareto sınırı: {REPORT_JSON_PATH}")
+
+    print(f"\n--- Pareto sınırı ({len(frontier)}/{len(results)} ayar) ---")
+    print(f"{'skip':>4} {'seq':>4} {'cmplx':>5} {'yolo':>5} {'pad':>4} | {'uyum':>6} {'klip':>6} "
+          f"{'hız(x)':>7} {'p95 ms':>7} {'tepki s':>7}")
+    for result in sorted(frontier, key=lambda r: -r['agreement']):
+        print(f"{result['frame_skip_rate']:>4} {result['sequence_length']:>4} {result['model_complexity']:>5} "
+              f"{result['min_yolo_confidence']:>5} {result['crop_padding']:>4} | {result['agreement']:>6.3f} "
+              f"{result['clip_accuracy']:>6.3f} {result['realtime_factor']:>7.2f} {result['latency_p95_ms']:>7.1f} "
+              f"{result['response_seconds']:>7.2f}")
+
+def main():
+    model, label_encoder = mpd.load_trained_model()
+    if model is None:
+        print("Model yüklenemedi. Program sonlandırılıyor.")
+        return
+    clips = find_labeled_clips(SWEEP_CLIP_ROOT)
+    if not clips:
+        print(f"'{SWEEP_CLIP_ROOT}' altında etiketli klip bulunamadı.")
+        return
+    unknown_labels = sorted({label for _, label in clips} - set(label_encoder.classes_))
+    if unknown_labels:
+        print(f"Uyarı: Modelde olmayan etiketler (uyum her zaman 0 olur): {unknown_labels}")
+
+    perceptions = [dict(zip(PERCEPTION_PARAMETERS, values))
+                   for values in itertools.product(*(PARAMETER_GRID[name] for name in PERCEPTION_PARAMETERS))]
+    sequence_lengths = usable_sequence_lengths(model, PARAMETER_GRID['sequence_length'])
+    if not sequence_lengths:
+        print("Modelle çalışan bir SEQUENCE_LENGTH bulunamadı. Program sonlandırılıyor.")
+        return
+
+    context = multiprocessing.get_context('spawn')
+    # --- 1. Aşama: algılama (önbellekte olmayanlar paralel işlenir) ---
+    tasks = [(video_path, perception) for video_path, _ in clips for perception in perceptions
+             if not os.path.exists(landmark_cache.cache_path(video_path, perception_settings(perception)))]
+    print(f"{len(clips)} klip x {len(perceptions)} algılama ayarı: "
+          f"{len(clips) * len(perceptions) - len(tasks)} önbellekte, {len(tasks)} işlenecek.")
+    if tasks:
+        with context.Pool(min(NUM_WORKERS, len(tasks)), initializer=init_worker) as pool:
+            for done, (video_path, perception, ok) in enumerate(pool.imap_unordered(run_perception, tasks), 1):
+                if not ok:
+                    print(f"Uyarı: Video açılamadı: {video_path}")
+                    continue
+                print(f"[{done}/{len(tasks)}] {os.path.basename(video_path)} {perception}")
+
+    # --- Hız ölçümü: tek işçi, ayarlar sırayla (süreçler birbirini yavaşlatmasın) ---
+    timing_clip = TIMING_CLIP or clips[0][0]
+    timings = load_timings()
+    timing_tasks = [(timing_clip, perception) for perception in perceptions
+                    if timing_key(timing_clip, perception) not in timings]
+    if timing_tasks:
+        print(f"{len(timing_tasks)} ayarın hızı '{timing_clip}' üzerinde ölçülüyor ({TIMING_FRAMES} kare)...")
+        with context.Pool(1, initializer=init_worker) as pool:
+            for perception, timing in pool.imap(run_timing, timing_tasks):
+                if timing is None:
+                    print(f"Uyarı: Hız ölçülemedi: {perception}")
+                    continue
+                timings[timing_key(timing_clip, perception)] = timing
+                save_timings(timings)
+                print(f"{perception}: {len(timing['latencies']) / timing['wall_seconds']:.1f} kare/sn")
+
+    # --- 2. Aşama: sınıflandırma ve ölçütler ---
+    classifier_latency = {length: measure_classifier_latency(model, length) for length in sequence_lengths}
+    results = []
+    for perception in perceptions:
+        timing = timings.get(timing_key(timing_clip, perception))
+        recordings = []
+        for video_path, label in clips:
+            recording = landmark_cache.LandmarkRecording.load(
+                landmark_cache.cache_path(video_path, perception_settings(perception)))
+            if recording is not None:
+                recordings.append((recording, label))
+        if timing is None or not recordings:
+            continue
+
+        frames = sum(len(recording) for recording, _ in recordings)
+        persons_per_frame = sum(int(recording.person_offsets[-1]) for recording, _ in recordings) / max(1, frames)
+        mean_fps = np.mean([recording.fps for recording, _ in recordings])
+        # Algılama maliyeti yarışmasız ölçümden: kare başına ortalama süre ve tüm kare gecikmelerinin p95'i
+        perception_seconds = timing['wall_seconds'] / len(timing['latencies'])
+        latency_p95 = float(np.percentile(timing['latencies'], 95))
+
+        for sequence_length in sequence_lengths:
+            correct = total = correct_clips = 0
+            for recording, label in recordings:
+                predicted = classify_windows(model, label_encoder, track_windows(recording, sequence_length))
+                total += len(predicted)
+                correct += sum(action == label for action in predicted)
+                confident = [action for action in predicted if action != "Unknown"]
+                if confident and max(set(confident), key=confident.count) == label:
+                    correct_clips += 1
+            # Canlı döngüde her pencere için bir model çağrısı yapılır (hareket kapısı hesaba katılmaz)
+            frame_seconds = perception_seconds + total / max(1, frames) * classifier_latency[sequence_length]
+            results.append({
+                **{name: perception[name] for name in PERCEPTION_PARAMETERS},
+                'sequence_length': sequence_length,
+                'agreement': round(correct / total, 4) if total else 0.0,
+                'clip_accuracy': round(correct_clips / len(recordings), 4),
+                'windows': total,
+                # Her örneklenmiş kare frame_skip_rate / fps saniyelik videoyu temsil eder
+                'realtime_factor': round(perception['frame_skip_rate'] / mean_fps / frame_seconds, 3),
+                'frames_per_second': round(1.0 / frame_seconds, 2),
+                'latency_p95_ms': round(1000 * (latency_p95
+                                                + persons_per_frame * classifier_latency[sequence_length]), 2),
+                'response_seconds': round(sequence_length * perception['frame_skip_rate'] / mean_fps, 3),
+                'clips': len(recordings),
+                'timing_frames': len(timing['latencies']),
+            })
+
+    if not results:
+        print("Hiçbir ayar için sonuç üretilemedi.")
+        return
+    write_report(results, pareto_frontier(results))
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import os
 import math
 from collections import deque
 import time
+import landmark_cache
+from inference_resolution import resize_for_inference
 
 # --- MediaPipe Modelleri ---
 mp_pose = mp.solutions.pose
@@ -16,8 +18,48 @@ mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
 
-pose_detector = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-hands_detector = mp_hands.Hands(min_detection_confidence=0.5, min_tracking_confidence=0.5, max_num_hands=2)
+# Pose/hands modellerine verilen görüntünün uzun kenarı (None: tam çözünürlük); landmark'lar orijinal kareye göre normalize edilir
+INFERENCE_SIZE = 640
+INFERENCE_LETTERBOX = False  # True: görüntü kare tuvale yerleştirilir (en-boy oranı korunur)
+
+# El modeli her karede tüm görüntüde çalışmaz; pose bilekleri ellerin birleşmiş olabileceğini gösterdiğinde
+# sadece bileklerin etrafındaki küçük bir kırpıntıda çalışır. Bilekler yeterince görünürse el modeli hiç çalışmaz.
+WRIST_VISIBILITY_THRESHOLD = 0.8  # Bu görünürlüğün üstündeki pose bilekleri doğrudan kullanılır
+HAND_CHECK_DISTANCE = 0.25        # Bilekler bundan yakınsa (normalize) el modeli çalıştırılır
+HAND_CROP_SCALE = 2.0             # Kırpıntı kenarı = ölçek x max(omuz genişliği, bilek mesafesi)
+HAND_CROP_MIN_SIZE = 128          # piksel
+HAND_INFERENCE_SIZE = 256         # El modeline verilen kırpıntının uzun kenarı
+
+# Landmark önbelleği: aynı video aynı ayarlarla daha önce işlendiyse pose/hands modelleri çalıştırılmaz,
+# analyze_pose eşikleri önbellekteki landmark'lar üzerinde pencere açılmadan denenir.
+USE_LANDMARK_CACHE = True
+POSE_SETTINGS = {
+    'pipeline': 'pose_detection',
+    'model_complexity': 1,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'hands_min_detection_confidence': 0.5,
+    'hands_min_tracking_confidence': 0.5,
+    'max_num_hands': 2,
+    'hands_mode': 'pose_guided_crop',
+    'wrist_visibility_threshold': WRIST_VISIBILITY_THRESHOLD,
+    'hand_check_distance': HAND_CHECK_DISTANCE,
+    'hand_crop_scale': HAND_CROP_SCALE,
+    'hand_crop_min_size': HAND_CROP_MIN_SIZE,
+    'hand_inference_size': HAND_INFERENCE_SIZE,
+    'frame_skip_rate': 1,
+    'inference_size': INFERENCE_SIZE,
+    'inference_letterbox': INFERENCE_LETTERBOX,
+}
+
+pose_detector = mp_pose.Pose(model_complexity=POSE_SETTINGS['model_complexity'],
+                             min_detection_confidence=POSE_SETTINGS['min_detection_confidence'],
+                             min_tracking_confidence=POSE_SETTINGS['min_tracking_confidence'])
+# Kırpıntının yeri kareden kareye değiştiği için el modeli takip modunda değil, tek görüntü modunda çalışır
+hands_detector = mp_hands.Hands(static_image_mode=True,
+                                min_detection_confidence=POSE_SETTINGS['hands_min_detection_confidence'],
+                                min_tracking_confidence=POSE_SETTINGS['hands_min_tracking_confidence'],
+                                max_num_hands=POSE_SETTINGS['max_num_hands'])
 
 # --- Parametreler ---
 MAX_DISPLAY_WIDTH = 1280
@@ -30,6 +72,7 @@ LOG_FILE = 'action_log_simple.json' # Basitleştirilmiş log dosyası
 last_predicted_label = "Tanımlanıyor..."
 current_action_start_time = time.time()
 action_history_log = []
+hand_detection_stats = {'frames': 0, 'hand_runs': 0, 'pose_wrists': 0}
 
 # --- Yardımcı Fonksiyonlar ---
 
@@ -49,16 +92,81 @@ def calculate_angle(a_lm, b_lm, c_lm):
         angle = 360 - angle
     return angle
 
+def confident_pose_wrists(pose_landmarks):
+    """İki pose bileği de yeterince görünürse (sol, sağ) bilek landmark'larını, değilse None döndürür."""
+    if not pose_landmarks:
+        return None
+    left_wrist = pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_WRIST]
+    right_wrist = pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_WRIST]
+    if min(left_wrist.visibility, right_wrist.visibility) < WRIST_VISIBILITY_THRESHOLD:
+        return None
+    return left_wrist, right_wrist
+
+def detect_hands_near_wrists(frame, pose_landmarks):
+    """
+    Pose bilekleri birbirine yakınsa el modelini sadece bileklerin etrafındaki kırpıntıda çalıştırır.
+    Bulunan el landmark'larını tam kareye göre normalize edilmiş olarak döndürür (çalışmadıysa None).
+    """
+    hand_detection_stats['frames'] += 1
+    if not pose_landmarks:
+        return None
+    if confident_pose_wrists(pose_landmarks):
+        # Bilekler güvenilir: alkış kontrolü doğrudan pose bilekleriyle yapılır
+        hand_detection_stats['pose_wrists'] += 1
+        return None
+
+    landmarks = pose_landmarks.landmark
+    left_wrist = landmarks[mp_pose.PoseLandmark.LEFT_WRIST]
+    right_wrist = landmarks[mp_pose.PoseLandmark.RIGHT_WRIST]
+    if calculate_distance(left_wrist, right_wrist) >= HAND_CHECK_DISTANCE:
+        return None
+
+    h, w, _ = frame.shape
+    left_shoulder = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER]
+    right_shoulder = landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER]
+    shoulder_width = np.hypot((left_shoulder.x - right_shoulder.x) * w, (left_shoulder.y - right_shoulder.y) * h)
+    wrist_distance = np.hypot((left_wrist.x - right_wrist.x) * w, (left_wrist.y - right_wrist.y) * h)
+    half_size = max(HAND_CROP_SCALE * max(shoulder_width, wrist_distance), HAND_CROP_MIN_SIZE) / 2
+    center_x = (left_wrist.x + right_wrist.x) / 2 * w
+    center_y = (left_wrist.y + right_wrist.y) / 2 * h
+
+    x1 = max(0, int(center_x - half_size))
+    y1 = max(0, int(center_y - half_size))
+    x2 = min(w, int(center_x + half_size))
+    y2 = min(h, int(center_y + half_size))
+    cropped_img = frame[y1:y2, x1:x2]
+    if cropped_img.size == 0:
+        return None
+
+    hand_detection_stats['hand_runs'] += 1
+    hand_image, hand_transform = resize_for_inference(cropped_img, HAND_INFERENCE_SIZE)
+    hands_results = hands_detector.process(cv2.cvtColor(hand_image, cv2.COLOR_BGR2RGB))
+    if not hands_results.multi_hand_landmarks:
+        return None
+
+    for hand_landmarks in hands_results.multi_hand_landmarks:
+        hand_transform.landmarks_to_source(hand_landmarks)
+        for landmark in hand_landmarks.landmark:
+            landmark.x = (landmark.x * (x2 - x1) + x1) / w
+            landmark.y = (landmark.y * (y2 - y1) + y1) / h
+    return hands_results.multi_hand_landmarks
+
 def analyze_pose(pose_landmarks, hands_landmarks):
     """
     Sadece 3 temel hareketi (Oturma, Ayakta Durma, Alkışlama) analiz eder.
+    El landmark'ları yoksa alkış kontrolü yeterince görünür pose bilekleriyle yapılır.
     """
     current_action = "Unknown"
     
     # --- Alkışlama Tespiti ---
+    wrists = None
     if hands_landmarks and len(hands_landmarks) >= 2:
-        wrist1 = hands_landmarks[0].landmark[0]
-        wrist2 = hands_landmarks[1].landmark[0]
+        wrists = hands_landmarks[0].landmark[0], hands_landmarks[1].landmark[0]
+    else:
+        wrists = confident_pose_wrists(pose_landmarks)
+
+    if wrists:
+        wrist1, wrist2 = wrists
         
         distance_between_hands = calculate_distance(wrist1, wrist2)
         
@@ -109,24 +217,81 @@ def analyze_pose(pose_landmarks, hands_landmarks):
         
     return current_action
 
-def log_action_if_changed(current_label):
+def log_action_if_changed(current_label, now=None):
     """
     Hareket değiştiğinde bir önceki hareketi ve süresini loglar.
+    now verilmezse gerçek saat kullanılır (önbellekten oynatmada video zamanı verilir).
     """
     global last_predicted_label, current_action_start_time, action_history_log
 
+    if now is None:
+        now = time.time()
+
     if current_label != last_predicted_label and last_predicted_label != "Tanımlanıyor...":
-        duration = time.time() - current_action_start_time
+        duration = now - current_action_start_time
         action_history_log.append({
             "action": last_predicted_label,
             "duration_seconds": round(duration, 2),
             "end_time": time.strftime("%Y-%m-%d %H:%M:%S")
         })
         print(f"Log: '{last_predicted_label}' - Süre: {round(duration, 2)} saniye")
-        current_action_start_time = time.time()
+        current_action_start_time = now
     
     last_predicted_label = current_label
 
+def update_stable_action(action_history, last_stable_action, now=None):
+    """
+    Son karelerdeki anlık hareketleri yumuşatır, kararlı hareket değiştiyse loglar
+    ve yeni kararlı hareketi döndürür.
+    """
+    # Hareket yumuşatma ve kararlı hareket tespiti
+    action_counts = {}
+    for action in action_history:
+        if action != "Unknown":
+            action_counts.setdefault(action, 0)
+            action_counts[action] += 1
+    
+    pose_label = last_stable_action
+    
+    if "Clapping" in action_counts and action_counts["Clapping"] >= MIN_CONFIDENT_FRAMES:
+        pose_label = "Clapping"
+    elif "Sitting" in action_counts and action_counts["Sitting"] >= MIN_CONFIDENT_FRAMES:
+        pose_label = "Sitting"
+    elif "Standing" in action_counts and action_counts["Standing"] >= MIN_CONFIDENT_FRAMES:
+        pose_label = "Standing"
+    elif action_counts:
+        most_common_action = max(action_counts, key=action_counts.get)
+        if action_counts[most_common_action] >= 2:
+            pose_label = most_common_action
+    
+    if pose_label != "Unknown" and action_counts.get(pose_label, 0) >= MIN_CONFIDENT_FRAMES:
+        log_action_if_changed(pose_label, now)
+        last_stable_action = pose_label
+    elif pose_label == "Unknown" and not action_counts:
+        log_action_if_changed(pose_label, now)
+        last_stable_action = "Unknown"
+    return last_stable_action
+
+def replay_from_cache(recording):
+    """Önbellekteki landmark'lar üzerinden, video çözmeden ve pencere açmadan hareket analizi yapar"""
+    global current_action_start_time
+
+    start_time = time.time()
+    action_history = deque(maxlen=ACTION_HISTORY_BUFFER_SIZE)
+    last_stable_action = "Tanımlanıyor..."
+    current_action_start_time = 0.0
+    video_time = 0.0
+
+    for cached in recording:
+        video_time = cached.frame_time
+        instant_action = analyze_pose(cached.pose_landmarks, cached.multi_hand_landmarks)
+        action_history.append(instant_action)
+        last_stable_action = update_stable_action(action_history, last_stable_action, video_time)
+
+    log_action_if_changed("Program Sonlandı", video_time)
+    print(f"Önbellekten {len(recording)} kare {time.time() - start_time:.2f} saniyede analiz edildi "
+          f"(video süresi: {video_time:.1f}s)")
+
 def main():
     global last_predicted_label, current_action_start_time, action_history_log
 
@@ -135,11 +300,25 @@ def main():
     # VIDEO_SOURCE = 0 # Canlı kamera için
     # --- AYARLAMALAR BİTTİ ---
 
+    cache_file, recording = (landmark_cache.load_or_none(VIDEO_SOURCE, POSE_SETTINGS)
+                             if USE_LANDMARK_CACHE else (None, None))
+    if recording is not None:
+        replay_from_cache(recording)
+        pose_detector.close()
+        hands_detector.close()
+        save_action_log()
+        return
+
     cap = cv2.VideoCapture(VIDEO_SOURCE)
     if not cap.isOpened():
         print(f"Hata: Video kaynağı '{VIDEO_SOURCE}' açılamadı.")
         return
 
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    recorder = landmark_cache.LandmarkRecorder(POSE_SETTINGS, fps)
+    frame_index = 0
+    reached_end = False
+
     # Hareket geçmişi ve stabilizasyon için deque
     action_history = deque(maxlen=ACTION_HISTORY_BUFFER_SIZE)
     last_stable_action = "Tanımlanıyor..."
@@ -151,6 +330,7 @@ def main():
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
+            reached_end = True
             break
 
         if not resized_window:
@@ -164,49 +344,30 @@ def main():
             cv2.resizeWindow('3 Action Detection', display_w, display_h)
             resized_window = True
 
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
-        pose_results = pose_detector.process(image)
-        hands_results = hands_detector.process(image)
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-
-        instant_action = analyze_pose(pose_results.pose_landmarks, hands_results.multi_hand_landmarks)
+        # Modeller küçültülmüş görüntüde çalışır, çizim tam çözünürlüklü kare üzerinde yapılır
+        inference_image, inference_transform = resize_for_inference(frame, INFERENCE_SIZE, INFERENCE_LETTERBOX)
+        image_rgb = cv2.cvtColor(inference_image, cv2.COLOR_BGR2RGB)
+        image_rgb.flags.writeable = False
+        pose_results = pose_detector.process(image_rgb)
+        inference_transform.landmarks_to_source(pose_results.pose_landmarks)
+        # El modeli sadece gerektiğinde, tam çözünürlüklü karede bileklerin etrafında çalışır
+        hand_landmarks_list = detect_hands_near_wrists(frame, pose_results.pose_landmarks)
+        image = frame
+        recorder.add_frame(frame_index, frame_index / fps,
+                           persons=[(None, None, pose_results.pose_landmarks)],
+                           hands=hand_landmarks_list)
+        frame_index += 1
+
+        instant_action = analyze_pose(pose_results.pose_landmarks, hand_landmarks_list)
         action_history.append(instant_action)
-
-        # Hareket yumuşatma ve kararlı hareket tespiti
-        action_counts = {}
-        for action in action_history:
-            if action != "Unknown":
-                action_counts.setdefault(action, 0)
-                action_counts[action] += 1
-        
-        pose_label = last_stable_action
-        
-        if "Clapping" in action_counts and action_counts["Clapping"] >= MIN_CONFIDENT_FRAMES:
-            pose_label = "Clapping"
-        elif "Sitting" in action_counts and action_counts["Sitting"] >= MIN_CONFIDENT_FRAMES:
-            pose_label = "Sitting"
-        elif "Standing" in action_counts and action_counts["Standing"] >= MIN_CONFIDENT_FRAMES:
-            pose_label = "Standing"
-        elif action_counts:
-            most_common_action = max(action_counts, key=action_counts.get)
-            if action_counts[most_common_action] >= 2:
-                pose_label = most_common_action
-        
-        if pose_label != "Unknown" and action_counts.get(pose_label, 0) >= MIN_CONFIDENT_FRAMES:
-            log_action_if_changed(pose_label)
-            last_stable_action = pose_label
-        elif pose_label == "Unknown" and not action_counts:
-            log_action_if_changed(pose_label)
-            last_stable_action = "Unknown"
+        last_stable_action = update_stable_action(action_history, last_stable_action)
 
         # Çizimler
         if pose_results.pose_landmarks:
             mp_drawing.draw_landmarks(image, pose_results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
                                      landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style())
-        if hands_results.multi_hand_landmarks:
-            for hand_landmarks in hands_results.multi_hand_landmarks:
+        if hand_landmarks_list:
+            for hand_landmarks in hand_landmarks_list:
                 mp_drawing.draw_landmarks(image, hand_landmarks, mp_hands.HAND_CONNECTIONS,
                                          mp_drawing_styles.get_default_hand_landmarks_style(),
                                          mp_drawing_styles.get_default_hand_connections_style())
@@ -228,8 +389,18 @@ def main():
     cv2.destroyAllWindows()
     pose_detector.close()
     hands_detector.close()
+    if hand_detection_stats['frames']:
+        print(f"El modeli {hand_detection_stats['frames']} karenin {hand_detection_stats['hand_runs']} tanesinde çalıştı "
+              f"({hand_detection_stats['pose_wrists']} karede pose bilekleri kullanıldı)")
+
+    # Önbellek sadece video sonuna kadar işlendiyse yazılır (yarım kayıt tekrar oynatılmasın)
+    if USE_LANDMARK_CACHE and reached_end:
+        recorder.save(cache_file)
+
+    save_action_log()
 
-    # Log dosyasını kaydet
+def save_action_log():
+    """Davranış geçmişini JSON log dosyasına kaydeder"""
     with open(LOG_FILE, 'w') as f:
         import json
         json.dump(action_history_log, f, indent=4)
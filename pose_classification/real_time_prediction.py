@@ -2,10 +2,15 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import os
+import time
 from collections import deque
 from tensorflow.keras.models import load_model
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 import joblib
+import landmark_cache
+from frame_source import FrameSource
+from inference_resolution import resize_for_inference
+from video_writer import AsyncVideoWriter
 
 # --- MediaPipe Modelleri ---
 mp_pose = mp.solutions.pose
@@ -18,6 +23,34 @@ MAX_DISPLAY_HEIGHT = 720
 SEQUENCE_LENGTH = 15  # 30'dan 15'e düşürdük - daha hızlı tepki
 FRAME_SKIP_RATE = 3   # 5'ten 3'e düşürdük - daha sık örnekleme
 
+DECODE_BACKEND = 'opencv'  # 'ffmpeg': kareler ayrı süreçte, çok iş parçacığıyla çözülür
+DECODE_PREFETCH = 4        # Arka planda önceden çözülecek örneklenmiş kare sayısı (0: kapalı)
+
+# Pose modeline verilen görüntünün uzun kenarı (None: tam çözünürlük); landmark'lar orijinal kareye göre normalize edilir
+POSE_INFERENCE_SIZE = 640
+INFERENCE_LETTERBOX = False  # True: görüntü kare tuvale yerleştirilir (en-boy oranı korunur)
+
+# İşaretlenmiş çıktı videosu (None: kaydedilmez). Kodlama arka planda yapılır, ana döngüyü bekletmez.
+OUTPUT_VIDEO_PATH = 'output/real_time_prediction_annotated.mp4'
+OUTPUT_CODEC = 'mp4v'
+OUTPUT_WIDTH = None              # None: kare boyutu korunur
+OUTPUT_FRAME_DECIMATION = 1      # Her N. işlenen kare yazılır
+OUTPUT_QUEUE_SIZE = 64
+OUTPUT_BACKPRESSURE = 'block'    # Kuyruk doluysa 'block' (bekle) veya 'drop' (kareyi atla)
+
+# Landmark önbelleği: aynı video aynı ayarlarla daha önce işlendiyse MediaPipe çalıştırılmaz,
+# tahminler önbellekteki keypoint'ler üzerinden pencere açılmadan yapılır.
+USE_LANDMARK_CACHE = True
+POSE_SETTINGS = {
+    'pipeline': 'real_time_prediction',
+    'model_complexity': 1,
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'frame_skip_rate': FRAME_SKIP_RATE,
+    'pose_inference_size': POSE_INFERENCE_SIZE,
+    'inference_letterbox': INFERENCE_LETTERBOX,
+}
+
 def load_trained_model():
     """Eğitilmiş modeli ve label encoder'ı yükle"""
     try:
@@ -62,7 +95,42 @@ def predict_action(model, label_encoder, keypoints_sequence):
     
     return predicted_action, confidence
 
-# ... (Diğer kodlar değişmeden kalıyor) ...
+def replay_from_cache(model, label_encoder, recording):
+    """Önbellekteki landmark'lar üzerinden, video çözmeden ve pencere açmadan tahmin yapar"""
+    start_time = time.time()
+    keypoints_history = deque(maxlen=SEQUENCE_LENGTH * 2)
+    windows = []
+    window_frames = []
+    for cached in recording:
+        keypoints_history.append(extract_pose_keypoints(cached.pose_landmarks))
+        if len(keypoints_history) >= SEQUENCE_LENGTH:
+            windows.append(list(keypoints_history)[-SEQUENCE_LENGTH:])
+            window_frames.append(cached)
+
+    if not windows:
+        print("Önbellekte tahmin için yeterli kare yok.")
+        return
+
+    # Tüm pencereler tek seferde (toplu) tahmin edilir
+    predictions = model.predict(np.array(windows, dtype=np.float32), verbose=0)
+    class_indices = np.argmax(predictions, axis=1)
+    actions = label_encoder.inverse_transform(class_indices)
+
+    action_counts = {}
+    last_action = None
+    for cached, action, class_index, scores in zip(window_frames, actions, class_indices, predictions):
+        action_counts[action] = action_counts.get(action, 0) + 1
+        if action != last_action:
+            print(f"Kare {cached.frame_index} ({cached.frame_time:.1f}s): {action} ({scores[class_index]:.2f})")
+            last_action = action
+
+    elapsed = time.time() - start_time
+    video_duration = recording.frame_times[-1] if len(recording) else 0.0
+    print(f"\nÖnbellekten {len(windows)} tahmin {elapsed:.2f} saniyede yapıldı "
+          f"(video süresi: {video_duration:.1f}s)")
+    for action, count in sorted(action_counts.items(), key=lambda item: -item[1]):
+        print(f"  {action}: {count} pencere (%{100.0 * count / len(windows):.1f})")
+
 
 def main():
     # Modeli yükle
@@ -77,28 +145,38 @@ def main():
         print("Lütfen test videonuzu bu klasöre koyun ve dosya adını kontrol edin.")
         return
 
-    cap = cv2.VideoCapture(VIDEO_SOURCE)
-    if not cap.isOpened():
+    cache_file, recording = (landmark_cache.load_or_none(VIDEO_SOURCE, POSE_SETTINGS)
+                             if USE_LANDMARK_CACHE else (None, None))
+    if recording is not None:
+        replay_from_cache(model, label_encoder, recording)
+        return
+
+    # Sadece her FRAME_SKIP_RATE. kare çözülür; aradaki kareler grab() ile atlanır
+    source = FrameSource(VIDEO_SOURCE, frame_skip_rate=FRAME_SKIP_RATE, first_sample=FRAME_SKIP_RATE - 1,
+                         backend=DECODE_BACKEND, prefetch=DECODE_PREFETCH)
+    if not source.is_opened():
         print(f"Video kaynağı açılamadı: {VIDEO_SOURCE}")
         return
 
+    recorder = landmark_cache.LandmarkRecorder(POSE_SETTINGS, source.fps)
+    reached_end = False
+    output_writer = None
+    if OUTPUT_VIDEO_PATH:
+        # Sadece örneklenen kareler gösterildiği için çıktı fps'i kare atlama oranına bölünür
+        output_writer = AsyncVideoWriter(OUTPUT_VIDEO_PATH, source.fps / FRAME_SKIP_RATE, codec=OUTPUT_CODEC,
+                                         output_width=OUTPUT_WIDTH, frame_decimation=OUTPUT_FRAME_DECIMATION,
+                                         queue_size=OUTPUT_QUEUE_SIZE, backpressure=OUTPUT_BACKPRESSURE)
+
     keypoints_history = deque(maxlen=SEQUENCE_LENGTH * 2)
-    frame_count = 0
     resized_window = False
 
     print("Real-time hareket tanıma başlatıldı...")
     print("Çıkış için ESC tuşuna basın")
 
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            frame_count += 1
-            if frame_count % FRAME_SKIP_RATE != 0:
-                continue
-
+    with mp_pose.Pose(model_complexity=POSE_SETTINGS['model_complexity'],
+                      min_detection_confidence=POSE_SETTINGS['min_detection_confidence'],
+                      min_tracking_confidence=POSE_SETTINGS['min_tracking_confidence']) as pose:
+        for frame_index, frame_time, frame in source:
             if not resized_window:
                 h, w, _ = frame.shape
                 scale_w = MAX_DISPLAY_WIDTH / w
@@ -110,11 +188,15 @@ def main():
                 cv2.resizeWindow('Real-time Action Recognition', display_w, display_h)
                 resized_window = True
 
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Pose küçültülmüş görüntüde çalışır, çizim tam çözünürlüklü kare üzerinde yapılır
+            pose_image, pose_transform = resize_for_inference(frame, POSE_INFERENCE_SIZE, INFERENCE_LETTERBOX)
+            image_rgb = cv2.cvtColor(pose_image, cv2.COLOR_BGR2RGB)
             image_rgb.flags.writeable = False
             results = pose.process(image_rgb)
-            image_rgb.flags.writeable = True
-            image = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+            pose_transform.landmarks_to_source(results.pose_landmarks)
+            image = frame
+            recorder.add_frame(frame_index, frame_time,
+                               persons=[(None, None, results.pose_landmarks)])
 
             keypoints = extract_pose_keypoints(results.pose_landmarks)
             keypoints_history.append(keypoints)
@@ -162,6 +244,9 @@ def main():
             cv2.putText(image, 'Press ESC to exit', (10, image.shape[0] - 20),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
 
+            if output_writer:
+                output_writer.write(image)
+
             if resized_window:
                 cv2.imshow('Real-time Action Recognition', cv2.resize(image, (display_w, display_h)))
             else:
@@ -169,9 +254,17 @@ def main():
 
             if cv2.waitKey(1) & 0xFF == 27:
                 break
+        else:
+            reached_end = True
 
-    cap.release()
+    source.release()
+    if output_writer:
+        output_writer.close()
     cv2.destroyAllWindows()
+
+    # Önbellek sadece video sonuna kadar işlendiyse yazılır (yarım kayıt tekrar oynatılmasın)
+    if USE_LANDMARK_CACHE and reached_end:
+        recorder.save(cache_file)
     print("Real-time hareket tanıma sonlandırıldı.")
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+# Bu betik, uzun kayıtları multiperson_detection.py ile aynı ayarlarla, birden çok çekirdekte işler.
+# Video örtüşen zaman dilimlerine bölünür; her dilim kendi YOLO/ByteTrack/MediaPipe modellerine sahip ayrı bir
+# süreçte işlenir ve kişi kutuları ile pozları geçici bir landmark dosyasına yazılır. Ana süreç dilimleri sırayla
+# alır, örtüşme bölgesindeki kutu ve poz benzerliğine göre takip ID'lerini dilimler arasında birleştirir ve
+# hareket tanıma + loglamayı tek bir zaman çizelgesi üzerinde çalıştırır. Böylece person_actions_log.csv
+# tüm video için tutarlı olur; en pahalı kısım (çözme, tespit, poz) çekirdek sayısıyla ölçeklenir.
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import cv2
+import numpy as np
+import mediapipe as mp
+import landmark_cache
+import multiperson_detection as mpd
+from frame_source import FrameSource
+
+mp_pose = mp.solutions.pose
+
+# --- Parametreler ---
+VIDEO_SOURCE = mpd.VIDEO_SOURCE
+NUM_WORKERS = os.cpu_count() or 1
+WORKER_THREADS = 1             # Her süreçte OpenCV/PyTorch iş parçacığı sayısı (çekirdekleri paylaşmak için)
+MIN_SEGMENT_DURATION = 30.0    # saniye; daha kısa videolar daha az dilime bölünür
+SEGMENT_OVERLAP = 3.0          # saniye; takip ID'lerini eşlemek için dilimlerin örtüştüğü süre
+STITCH_MIN_IOU = 0.3           # Örtüşmede aynı kişi sayılmak için gereken minimum kutu IoU
+STITCH_MIN_FRAMES = 3          # Eşleşme için iki takibin birlikte görülmesi gereken minimum kare sayısı
+
+def plan_segments(video_path):
+    """
+    Videoyu dilimlere böler. Her dilim için (işleme başlangıcı, nominal başlangıç, bitiş) kare
+    indekslerini ve fps'i döndürür; işleme başlangıcı önceki dilimle örtüşür.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if frame_count <= 0:
+        return [], fps
+
+    duration = frame_count / fps
+    num_segments = max(1, min(NUM_WORKERS * 2, int(duration // MIN_SEGMENT_DURATION)))
+    segment_length = math.ceil(frame_count / num_segments)
+    overlap_frames = int(round(SEGMENT_OVERLAP * fps))
+    segments = []
+    for k in range(num_segments):
+        start = k * segment_length
+        end = min(frame_count, start + segment_length)
+        if start >= end:
+            break
+        segments.append((max(0, start - overlap_frames), start, end))
+    return segments, fps
+
+def init_worker():
+    """Her süreç çekirdeklerden sadece birini kullansın"""
+    cv2.setNumThreads(WORKER_THREADS)
+    import torch
+    torch.set_num_threads(WORKER_THREADS)
+
+def process_segment(task):
+    """Bir video dilimini işler (tespit + takip + poz) ve sonucu landmark dosyasına yazar."""
+    video_path, start_time, end_time, output_path = task
+    # Süreçler birden çok dilim işler; önceki dilimin ByteTrack durumu bu dilime taşınmasın diye
+    # takipçi sıfırlanır. Aksi halde örtüşme karelerinde eski takipler eşleşir.
+    mpd.reset_tracker()
+    source = FrameSource(video_path, frame_skip_rate=mpd.FRAME_SKIP_RATE, first_sample=mpd.FRAME_SKIP_RATE - 1,
+                         start_time=start_time, end_time=end_time, backend=mpd.DECODE_BACKEND)
+    settings = dict(mpd.POSE_SETTINGS, segment=[start_time, end_time])
+    recorder = landmark_cache.LandmarkRecorder(settings, source.fps)
+    with mp_pose.Pose(
+        static_image_mode=False,
+        model_complexity=mpd.POSE_SETTINGS['model_complexity'],
+        min_detection_confidence=mpd.POSE_SETTINGS['min_detection_confidence'],
+        min_tracking_confidence=mpd.POSE_SETTINGS['min_tracking_confidence']) as pose:
+        for frame_index, video_time, frame in source:
+            recorder.add_frame(frame_index, video_time, persons=mpd.detect_persons(frame, pose))
+    source.release()
+    recorder.save(output_path)
+    return output_path
+
+def box_iou(box_a, box_b):
+    """İki xyxy kutunun kesişim / birleşim oranı"""
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+def stitch_track_ids(previous_overlap, current_overlap, previous_ids):
+    """
+    Örtüşme bölgesinde önceki ve yeni dilimin takiplerini eşler.
+    previous_overlap / current_overlap: {kare indeksi: [CachedPerson]}
+    previous_ids: önceki dilimin yerel ID -> global ID eşlemesi
+    Yeni dilimin eşleşen yerel ID'leri için {yerel ID: global ID} döndürür.
+    """
+    scores = {}
+    for frame_index, previous_persons in previous_overlap.items():
+        for current in current_overlap.get(frame_index, ()):
+            for previous in previous_persons:
+                iou = box_iou(previous.box, current.box)
+                if iou < STITCH_MIN_IOU:
+                    continue
+                # Kutu örtüşmesi yüksek, poz farkı düşük olan çiftler daha yüksek puan alır
+                pose_difference = mpd.window_motion(current.pose_array[None, :, :2], previous.pose_array[None, :, :2])
+                total, count = scores.get((previous.track_id, current.track_id), (0.0, 0))
+                scores[(previous.track_id, current.track_id)] = (total + iou - pose_difference, count + 1)
+
+    candidates = sorted(((total / count, previous_id, current_id)
+                         for (previous_id, current_id), (total, count) in scores.items()
+                         if count >= STITCH_MIN_FRAMES), reverse=True)
+    stitched = {}
+    used_previous = set()
+    for _, previous_id, current_id in candidates:
+        if previous_id in used_previous or current_id in stitched or previous_id not in previous_ids:
+            continue
+        stitched[current_id] = previous_ids[previous_id]
+        used_previous.add(previous_id)
+    return stitched
+
+def main():
+    model, label_encoder = mpd.load_trained_model()
+    if model is None:
+        print("Model yüklenemedi. Program sonlandırılıyor.")
+        return
+
+    segments, fps = plan_segments(VIDEO_SOURCE)
+    if not segments:
+        print(f"Video kaynağı açılamadı veya boş: {VIDEO_SOURCE}")
+        return
+
+    mpd.setup_log_file()
+    temp_dir = tempfile.mkdtemp(prefix='segments_')
+    tasks = [(VIDEO_SOURCE, process_start / fps, end / fps, os.path.join(temp_dir, f"segment_{k:03d}.npz"))
+             for k, (process_start, _, end) in enumerate(segments)]
+    print(f"{len(segments)} dilim {min(NUM_WORKERS, len(segments))} süreçte işleniyor...")
+
+    start_time = time.time()
+    person_trackers = {}
+    analytics = mpd.create_crowd_analytics()
+    next_global_id = 1
+    previous_ids = {}
+    previous_overlap = {}
+    video_time = 0.0
+    try:
+        # spawn: her süreç modelleri kendisi yükler, ByteTrack durumu süreçler arasında paylaşılmaz
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(min(NUM_WORKERS, len(segments)), initializer=init_worker) as pool:
+            # imap sonuçları sırayla verir; ilk dilim bittiğinde diğerleri işlenirken birleştirme başlar
+            for k, path in enumerate(pool.imap(process_segment, tasks)):
+                recording = landmark_cache.LandmarkRecording.load(path)
+                if recording is None:
+                    print(f"Uyarı: {k}. dilim okunamadı, atlanıyor.")
+                    previous_ids, previous_overlap = {}, {}
+                    continue
+                _, nominal_start, _ = segments[k]
+                next_start = segments[k + 1][0] if k + 1 < len(segments) else None
+
+                frames = list(recording)
+                current_overlap = {cached.frame_index: cached.persons
+                                   for cached in frames if cached.frame_index < nominal_start}
+                local_ids = stitch_track_ids(previous_overlap, current_overlap, previous_ids)
+                print(f"{k}. dilim: {len(local_ids)} takip önceki dilimle birleştirildi")
+
+                previous_overlap = {}
+                for cached in frames:
+                    # Örtüşme kareleri önceki dilimde zaten işlendi
+                    if cached.frame_index < nominal_start:
+                        continue
+                    video_time = cached.frame_time
+                    for person in cached.persons:
+                        if person.track_id not in local_ids:
+                            local_ids[person.track_id] = next_global_id
+                            next_global_id += 1
+                        mpd.update_person_tracker(person_trackers, local_ids[person.track_id], person.pose_array,
+                                                  video_time, model, label_encoder)
+                    person_trackers = mpd.expire_trackers(person_trackers, video_time)
+                    mpd.update_crowd_analytics(analytics, person_trackers, video_time)
+                    if next_start is not None and cached.frame_index >= next_start:
+                        previous_overlap[cached.frame_index] = cached.persons
+                previous_ids = local_ids
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    mpd.flush_trackers(person_trackers)
+    mpd.finish_crowd_analytics(analytics)
+    print(f"Video ({video_time:.1f}s) {time.time() - start_time:.1f} saniyede işlendi, "
+          f"{next_global_id - 1} farklı kişi takip edildi.")
+    mpd.print_gating_stats()
+
+if __name__ == "__main__":
+    main()
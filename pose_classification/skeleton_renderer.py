@@ -0,0 +1,68 @@
+# Bu modül, bir karedeki tüm kişilerin iskeletlerini ve kutularını toplu OpenCV çağrılarıyla çizer.
+# mp_drawing.draw_landmarks her kişi için her karede stil nesnesi oluşturup landmark'ları tek tek çizerken,
+# burada bağlantı indeksleri ve renkler bir kez hesaplanır; tüm kişilerin çizgileri tek bir cv2.polylines
+# çağrısıyla, noktalar ise sol/sağ/orta grupları için birer çağrıyla çizilir.
+import cv2
+import mediapipe as mp
+import numpy as np
+
+mp_pose = mp.solutions.pose
+
+VISIBILITY_THRESHOLD = 0.5  # mp_drawing ile aynı: daha az görünür landmark'lar çizilmez
+
+# Bağlantı ve landmark grupları modül yüklenirken bir kez hesaplanır
+POSE_CONNECTION_INDICES = np.array(sorted(mp_pose.POSE_CONNECTIONS), dtype=np.int32)
+LEFT_LANDMARKS = np.array([lm.value for lm in mp_pose.PoseLandmark if lm.name.startswith('LEFT')], dtype=np.int32)
+RIGHT_LANDMARKS = np.array([lm.value for lm in mp_pose.PoseLandmark if lm.name.startswith('RIGHT')], dtype=np.int32)
+CENTER_LANDMARKS = np.array([lm.value for lm in mp_pose.PoseLandmark
+                             if not lm.name.startswith(('LEFT', 'RIGHT'))], dtype=np.int32)
+
+class SkeletonRenderer:
+    """Tüm kişilerin iskeletlerini ve kutularını toplu çizen, stilleri önceden hesaplanmış çizici"""
+    def __init__(self, box_color=(0, 255, 0), connection_color=(224, 224, 224),
+                 left_color=(0, 138, 255), right_color=(231, 217, 0), center_color=(224, 224, 224),
+                 thickness=2, point_radius=3):
+        self.box_color = box_color
+        self.connection_color = connection_color
+        self.point_groups = [(LEFT_LANDMARKS, left_color), (RIGHT_LANDMARKS, right_color),
+                             (CENTER_LANDMARKS, center_color)]
+        self.thickness = thickness
+        self.point_thickness = point_radius * 2
+
+    def draw(self, frame, poses, labels=None):
+        """
+        poses: (33, 4) float32 dizilerinin listesi (x, y, z, visibility; kareye göre normalize).
+        labels: her kişinin kutusunun üstüne yazılacak metin (isteğe bağlı).
+        """
+        if not poses:
+            return frame
+        h, w = frame.shape[:2]
+        poses = np.asarray(poses, dtype=np.float32)
+        points = (poses[:, :, :2] * (w, h)).astype(np.int32)
+        visible = poses[:, :, 3] >= VISIBILITY_THRESHOLD
+
+        # Bağlantılar: iki ucu da görünür olan tüm çizgiler tek çağrıda
+        segments = points[:, POSE_CONNECTION_INDICES]
+        segment_visible = visible[:, POSE_CONNECTION_INDICES].all(axis=2)
+        if segment_visible.any():
+            cv2.polylines(frame, segments[segment_visible], False, self.connection_color, self.thickness, cv2.LINE_AA)
+
+        # Noktalar: sıfır uzunluklu kalın çizgiler yuvarlak nokta olarak çizilir
+        for indices, color in self.point_groups:
+            group_points = points[:, indices][visible[:, indices]]
+            if len(group_points):
+                dots = np.repeat(group_points[:, None, :], 2, axis=1)
+                cv2.polylines(frame, dots, False, color, self.point_thickness, cv2.LINE_AA)
+
+        # Kutular: tüm landmark'ları kapsayan dikdörtgenler tek çağrıda
+        mins = points.min(axis=1)
+        maxs = points.max(axis=1)
+        boxes = np.stack([mins, np.stack([maxs[:, 0], mins[:, 1]], axis=1),
+                          maxs, np.stack([mins[:, 0], maxs[:, 1]], axis=1)], axis=1)
+        cv2.polylines(frame, boxes, True, self.box_color, self.thickness)
+
+        if labels:
+            for (x1, y1), label in zip(mins, labels):
+                cv2.putText(frame, label, (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                            self.box_color, 2, cv2.LINE_AA)
+        return frame
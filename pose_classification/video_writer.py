@@ -0,0 +1,183 @@
+# Bu modül, işaretlenmiş kareleri ana döngüyü bekletmeden video dosyasına yazar.
+# Kareler sınırlı bir kuyruğa konur; kodlama (ve isteğe bağlı yeniden boyutlandırma) arka plandaki bir
+# iş parçacığında veya ayrı bir süreçte yapılır. Kuyruk dolduğunda 'block' politikası ana döngüyü bekletir,
+# 'drop' politikası kareyi atlar. Kapanışta kodlama hızı (kare/sn) ve atlanan kare sayısı raporlanır.
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import cv2
+
+_STOP = None
+WORKER_POLL_SECONDS = 1.0  # Kuyruk beklerken kodlayıcının hâlâ çalışıp çalışmadığı bu aralıkla kontrol edilir
+
+def _open_writer(path, codec, fps, frame_size):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, frame_size)
+    if not writer.isOpened():
+        print(f"Uyarı: Çıktı videosu açılamadı: {path} (codec: {codec})")
+        return None
+    return writer
+
+def _encode_loop(frame_queue, path, codec, fps, output_size, stats):
+    """Kuyruktan kareleri alıp kodlar; stats sözlüğüne yazılan kare sayısı ve kodlama süresini ekler."""
+    writer = None
+    try:
+        while True:
+            frame = frame_queue.get()
+            if frame is _STOP:
+                break
+            start = time.perf_counter()
+            if output_size and (frame.shape[1], frame.shape[0]) != output_size:
+                frame = cv2.resize(frame, output_size, interpolation=cv2.INTER_AREA)
+            if writer is None:
+                writer = _open_writer(path, codec, fps, (frame.shape[1], frame.shape[0]))
+                if writer is None:
+                    # Açılamadıysa kuyruğu boşaltmaya devam et ki üretici takılmasın
+                    writer = False
+            if writer:
+                writer.write(frame)
+                stats['frames_written'] += 1
+            stats['encode_seconds'] += time.perf_counter() - start
+    finally:
+        if writer:
+            writer.release()
+
+def _encode_process(frame_queue, result_queue, path, codec, fps, output_size):
+    stats = {'frames_written': 0, 'encode_seconds': 0.0}
+    _encode_loop(frame_queue, path, codec, fps, output_size, stats)
+    result_queue.put(stats)
+
+class AsyncVideoWriter:
+    """
+    Kareleri arka planda kodlayan video yazıcı.
+
+    codec: FourCC kodu (örn. 'mp4v', 'XVID', 'avc1')
+    output_width: çıktı genişliği (None: kare boyutu korunur, yükseklik en-boy oranına göre hesaplanır)
+    frame_decimation: her N. kare yazılır (çıktı fps'i buna göre düşürülür)
+    backpressure: kuyruk doluysa 'block' (bekle) veya 'drop' (kareyi atla)
+    use_process: True ise kodlama ayrı bir süreçte yapılır (kareler süreçler arası kopyalanır)
+    """
+    def __init__(self, path, fps, codec='mp4v', output_width=None, frame_decimation=1,
+                 queue_size=64, backpressure='block', use_process=False):
+        if backpressure not in ('block', 'drop'):
+            raise ValueError(f"Geçersiz backpressure politikası: {backpressure}")
+        self.path = path
+        self.codec = codec
+        self.output_width = output_width
+        self.frame_decimation = max(1, int(frame_decimation))
+        self.fps = fps / self.frame_decimation
+        self.backpressure = backpressure
+        self.use_process = use_process
+        self.queue_size = queue_size
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.stats = {'frames_written': 0, 'encode_seconds': 0.0}
+        self._worker = None
+        self._worker_failed = False
+        self._start_time = None
+
+    def _output_size(self, frame):
+        h, w = frame.shape[:2]
+        if not self.output_width or self.output_width == w:
+            return None
+        return self.output_width, int(round(h * self.output_width / w)) // 2 * 2
+
+    def _start(self, frame):
+        output_size = self._output_size(frame)
+        if self.use_process:
+            self._queue = multiprocessing.Queue(maxsize=self.queue_size)
+            self._result_queue = multiprocessing.Queue()
+            self._worker = multiprocessing.Process(
+                target=_encode_process,
+                args=(self._queue, self._result_queue, self.path, self.codec, self.fps, output_size),
+                daemon=True)
+        else:
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._worker = threading.Thread(
+                target=_encode_loop,
+                args=(self._queue, self.path, self.codec, self.fps, output_size, self.stats),
+                daemon=True)
+        self._worker.start()
+        self._start_time = time.perf_counter()
+
+    def _check_worker(self):
+        """Kodlayıcı beklenmedik şekilde durduysa bir kez uyarır; çalışıyorsa True döndürür."""
+        if self._worker_failed:
+            return False
+        if self._worker.is_alive():
+            return True
+        self._worker_failed = True
+        print(f"Uyarı: Video kodlayıcı beklenmedik şekilde durdu, kalan kareler yazılmayacak: {self.path}")
+        return False
+
+    def _put(self, item):
+        """Öğeyi kuyruğa koyar; kuyruk doluyken kodlayıcı durursa sonsuza kadar beklemez, False döndürür."""
+        while self._check_worker():
+            try:
+                self._queue.put(item, timeout=WORKER_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write(self, frame):
+        """Kareyi kodlama kuyruğuna ekler; kare atlandıysa False döndürür."""
+        index = self.frames_submitted
+        self.frames_submitted += 1
+        if index % self.frame_decimation != 0:
+            return False
+        if self._worker is None:
+            self._start(frame)
+        if self.backpressure == 'block':
+            if self._put(frame):
+                return True
+            self.frames_dropped += 1
+            return False
+        try:
+            if self._check_worker():
+                self._queue.put_nowait(frame)
+                return True
+        except queue.Full:
+            pass
+        self.frames_dropped += 1
+        return False
+
+    def close(self):
+        """Kuyruktaki kareler yazılana kadar bekler, dosyayı kapatır ve kodlama istatistiklerini yazdırır."""
+        if self._worker is None:
+            return self.stats
+        self._put(_STOP)
+        if self.use_process:
+            # Süreç sonuçları göndermeden ölürse beklemeyi bırak
+            while True:
+                try:
+                    self.stats = self._result_queue.get(timeout=WORKER_POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    if not self._worker.is_alive():
+                        # Süreç sonuçları koyduktan hemen sonra çıkmış olabilir, son bir kez okunur
+                        try:
+                            self.stats = self._result_queue.get(timeout=WORKER_POLL_SECONDS)
+                        except queue.Empty:
+                            self._check_worker()
+                        break
+        # Zaman aşımı bir son tarih değil, sadece canlılık kontrolüdür: sağlıklı kodlayıcı kuyruktaki tüm
+        # kareleri yazıp dosyayı kapatana kadar beklenir; çöken kodlayıcı da is_alive() False olunca bırakılır
+        while self._worker.is_alive():
+            self._worker.join(timeout=WORKER_POLL_SECONDS)
+        self._worker = None
+
+        elapsed = time.perf_counter() - self._start_time
+        written = self.stats['frames_written']
+        encode_fps = written / self.stats['encode_seconds'] if self.stats['encode_seconds'] else 0.0
+        print(f"Çıktı videosu kaydedildi: {self.path} ({written} kare, {self.frames_dropped} kare atlandı, "
+              f"kodlama hızı: {encode_fps:.1f} kare/sn, toplam süre: {elapsed:.1f}s)")
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
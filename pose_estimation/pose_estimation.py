@@ -1,7 +1,14 @@
-import cv2
-import mediapipe as mp
+import argparse
+import hashlib
+import json
+import multiprocessing
 import os
 import re # Doğal sıralama için re (regular expression) modülünü içe aktarıyoruz
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import mediapipe as mp
+import numpy as np
 
 # --- MediaPipe Kurulumu ---
 mp_pose = mp.solutions.pose
@@ -10,9 +17,45 @@ mp_drawing = mp.solutions.drawing_utils
 # --- Yapılandırma ---
 IMAGE_FOLDER = "images"  # Resimlerinizin bulunduğu klasör
 MAX_DISPLAY_DIM = 800    # Görüntünün ekranda gösterileceği maksimum boyut (genişlik veya yükseklik)
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+# --- Toplu İşleme ve Önbellek ---
+# Poz sonuçları resim dosyasının SHA-1 özetiyle önbelleğe yazılır; aynı resim (farklı adla veya
+# farklı klasörde olsa bile) tekrar işlenmez ve görüntüleyici A/D ile geri dönüldüğünde çıkarım yapmaz.
+CACHE_DIR = "pose_cache"
+CACHE_VERSION = 1
+INFERENCE_MAX_DIM = MAX_DISPLAY_DIM  # Poz modeline verilen görüntünün maksimum boyutu
+MODEL_COMPLEXITY = 1
+POSE_SETTINGS = {
+    'version': CACHE_VERSION,
+    'model_complexity': MODEL_COMPLEXITY,
+    'inference_max_dim': INFERENCE_MAX_DIM,
+}
+BATCH_OUTPUT_DIR = "output/pose_batch"
+BATCH_OUTPUT_FORMAT = "json"  # "json" veya "npz"
+BATCH_WORKERS = os.cpu_count() or 1
+
+KEYPOINTS_TO_SHOW = {
+    "Nose": mp_pose.PoseLandmark.NOSE,
+    "L_Wrist": mp_pose.PoseLandmark.LEFT_WRIST,
+    "R_Wrist": mp_pose.PoseLandmark.RIGHT_WRIST,
+    "L_Shoulder": mp_pose.PoseLandmark.LEFT_SHOULDER,
+    "R_Shoulder": mp_pose.PoseLandmark.RIGHT_SHOULDER,
+    "L_Elbow": mp_pose.PoseLandmark.LEFT_ELBOW,
+    "L_Ankle": mp_pose.PoseLandmark.LEFT_ANKLE,
+    "R_Ankle": mp_pose.PoseLandmark.RIGHT_ANKLE,
+}
 
 # --- Poz Algılama Modeli ---
-pose = mp_pose.Pose(static_image_mode=True)
+# Model ilk kullanımda oluşturulur; böylece toplu işlemedeki her süreç kendi modelini yükler ve
+# görüntüleyicide model sadece arka plandaki ön yükleme iş parçacığında kullanılır.
+pose = None
+
+def get_pose():
+    global pose
+    if pose is None:
+        pose = mp_pose.Pose(static_image_mode=True, model_complexity=MODEL_COMPLEXITY)
+    return pose
 
 # --- Yardımcı Fonksiyonlar ---
 def resize_for_display(image, max_dim):
@@ -36,22 +79,143 @@ def get_image_list(folder):
     if not os.path.exists(folder):
         print(f"Hata: Resim klasörü '{folder}' bulunamadı. Lütfen '{folder}' adında bir klasör oluşturun.")
         return []
-    images = [img for img in os.listdir(folder) if img.lower().endswith((".jpg", ".png", ".jpeg"))]
+    images = [img for img in os.listdir(folder) if img.lower().endswith(IMAGE_EXTENSIONS)]
     images.sort(key=natural_sort_key) # Dosyaları doğal (sayısal) sıraya göre sıralarız
     return images
 
-def display_keypoint_names(image, results, keypoints_to_show):
+def find_images_recursive(root):
+    """Klasör ağacındaki tüm resimleri, köke göre göreli yollarıyla doğal sırada listeler."""
+    images = []
+    for folder, subfolders, files in os.walk(root):
+        subfolders.sort(key=natural_sort_key)
+        for name in sorted(files, key=natural_sort_key):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.relpath(os.path.join(folder, name), root))
+    return images
+
+def display_keypoint_names(image, landmarks, keypoints_to_show):
     """Belirli kilit noktaların isimlerini resim üzerine yazar."""
-    if results.pose_landmarks:
+    if landmarks is not None:
+        h, w = image.shape[:2]
         for name, landmark_enum in keypoints_to_show.items():
-            landmark = results.pose_landmarks.landmark[landmark_enum.value]
-            h, w, _ = image.shape
-            cx, cy = int(landmark.x * w), int(landmark.y * h)
+            x, y = landmarks[landmark_enum.value, :2]
+            cx, cy = int(x * w), int(y * h)
             cv2.putText(image, name, (cx + 10, cy),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
 
     return image
 
+def array_to_landmarks(landmarks):
+    """(33, 4) diziyi mp_drawing'in beklediği NormalizedLandmarkList'e çevirir"""
+    from mediapipe.framework.formats import landmark_pb2
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list
+
+def draw_pose(image, landmarks, keypoints_to_show=KEYPOINTS_TO_SHOW):
+    """İskeleti ve kilit nokta isimlerini resmin üzerine çizer."""
+    if landmarks is None:
+        return image
+    mp_drawing.draw_landmarks(
+        image,
+        array_to_landmarks(landmarks),
+        mp_pose.POSE_CONNECTIONS,
+        landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
+        connection_drawing_spec=mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
+    )
+    return display_keypoint_names(image, landmarks, keypoints_to_show)
+
+# --- Poz Önbelleği ---
+def cache_path(image_digest):
+    return os.path.join(CACHE_DIR, image_digest[:2], image_digest + ".npz")
+
+def load_cached_pose(image_digest):
+    """
+    Önbellekteki sonucu döndürür: (33, 4) dizi, poz bulunamadıysa None.
+    Önbellekte yoksa veya ayarlar farklıysa False döndürür.
+    """
+    path = cache_path(image_digest)
+    if not os.path.exists(path):
+        return False
+    try:
+        with np.load(path) as data:
+            if json.loads(str(data['settings'])) != POSE_SETTINGS:
+                return False
+            landmarks = data['landmarks']
+    except (OSError, ValueError, KeyError):
+        print(f"Uyarı: Bozuk önbellek dosyası yok sayılıyor: {path}")
+        return False
+    return landmarks if len(landmarks) else None
+
+def save_cached_pose(image_digest, landmarks):
+    path = cache_path(image_digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Paralel süreçler aynı resmi yazarsa yarım dosya okunmasın diye önce geçici dosyaya yazılır
+    tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path,
+             landmarks=np.zeros((0, 4), dtype=np.float32) if landmarks is None else landmarks,
+             settings=json.dumps(POSE_SETTINGS))
+    os.replace(tmp_path, path)
+
+def detect_pose(image):
+    """Resimdeki pozu bulur; (33, 4) float32 dizi (x, y, z, visibility) veya None döndürür."""
+    image_rgb = cv2.cvtColor(resize_for_display(image, INFERENCE_MAX_DIM), cv2.COLOR_BGR2RGB)
+    results = get_pose().process(image_rgb)
+    if not results.pose_landmarks:
+        return None
+    return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark],
+                    dtype=np.float32)
+
+def load_image_and_pose(img_path):
+    """
+    Resmi okur ve pozunu önbellekten veya modelden alır.
+    (resim, landmarks, resim özeti, önbellekten mi) döndürür; resim okunamazsa resim None olur.
+    """
+    try:
+        data = np.fromfile(img_path, dtype=np.uint8)
+    except OSError:
+        return None, None, None, False
+    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if image is None:
+        return None, None, None, False
+    image_digest = hashlib.sha1(data).hexdigest()
+    landmarks = load_cached_pose(image_digest)
+    if landmarks is not False:
+        return image, landmarks, image_digest, True
+    landmarks = detect_pose(image)
+    save_cached_pose(image_digest, landmarks)
+    return image, landmarks, image_digest, False
+
+class PosePrefetcher:
+    """
+    Resimleri ve pozlarını tek bir arka plan iş parçacığında hazırlar.
+    Görüntüleyici bir resmi gösterirken sonraki resmin pozu hesaplanır; MediaPipe modeli
+    iş parçacıkları arasında paylaşılmadığı için tüm çıkarımlar bu iş parçacığında yapılır.
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+
+    def request(self, img_path):
+        if img_path not in self.pending:
+            self.pending[img_path] = self.executor.submit(load_image_and_pose, img_path)
+        return self.pending[img_path]
+
+    def get(self, img_path, prefetch_paths=()):
+        """img_path'in sonucunu bekler, prefetch_paths'i sıraya koyar ve diğer sonuçları bellekten atar."""
+        result = self.request(img_path).result()
+        for path in prefetch_paths:
+            self.request(path)
+        keep = {img_path, *prefetch_paths}
+        for path in list(self.pending):
+            if path not in keep and self.pending[path].done():
+                del self.pending[path]
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
 # --- Ana Uygulama Mantığı ---
 def run_simple_pose_viewer():
     image_files = get_image_list(IMAGE_FOLDER)
@@ -61,17 +225,7 @@ def run_simple_pose_viewer():
         return
 
     current_image_index = 0
-
-    keypoints_to_show = {
-        "Nose": mp_pose.PoseLandmark.NOSE,
-        "L_Wrist": mp_pose.PoseLandmark.LEFT_WRIST,
-        "R_Wrist": mp_pose.PoseLandmark.RIGHT_WRIST,
-        "L_Shoulder": mp_pose.PoseLandmark.LEFT_SHOULDER,
-        "R_Shoulder": mp_pose.PoseLandmark.RIGHT_SHOULDER,
-        "L_Elbow": mp_pose.PoseLandmark.LEFT_ELBOW,
-        "L_Ankle": mp_pose.PoseLandmark.LEFT_ANKLE,
-        "R_Ankle": mp_pose.PoseLandmark.RIGHT_ANKLE,
-    }
+    prefetcher = PosePrefetcher()
 
     cv2.namedWindow("Pose Viewer", cv2.WINDOW_AUTOSIZE)
 
@@ -80,8 +234,12 @@ def run_simple_pose_viewer():
         current_image_index = max(0, min(current_image_index, len(image_files) - 1))
 
         img_path = os.path.join(IMAGE_FOLDER, image_files[current_image_index])
-                
-        image = cv2.imread(img_path)
+        # Sonraki (ve geri dönüş için önceki) resmin pozu bu resim gösterilirken hazırlanır
+        neighbour_paths = [os.path.join(IMAGE_FOLDER, image_files[i])
+                           for i in (current_image_index + 1, current_image_index - 1)
+                           if 0 <= i < len(image_files)]
+
+        image, landmarks, _, _ = prefetcher.get(img_path, neighbour_paths)
 
         if image is None:
             print(f"UYARI: Resim yüklenemedi veya bulunamadı: {img_path}. Sonraki resme geçiliyor.")
@@ -89,18 +247,7 @@ def run_simple_pose_viewer():
             continue # Döngünün başına dön ve yeni dizinle tekrar dene
 
         display_image = resize_for_display(image.copy(), MAX_DISPLAY_DIM)
-        image_rgb = cv2.cvtColor(display_image, cv2.COLOR_BGR2RGB)
-        results = pose.process(image_rgb)
-
-        if results.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                display_image,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                connection_drawing_spec=mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
-            )
-            display_image = display_keypoint_names(display_image, results, keypoints_to_show)
+        display_image = draw_pose(display_image, landmarks)
 
         # Bilgi metni sadece indeks ve toplam sayıyı gösterecek şekilde düzenlendi
         info_text = f"{current_image_index + 1}/{len(image_files)}"
@@ -121,9 +268,93 @@ def run_simple_pose_viewer():
         elif key == ord('a'):  # 'a' tuşu ile önceki resim
             current_image_index -= 1
 
-    pose.close()
+    prefetcher.close()
+    if pose is not None:
+        pose.close()
     cv2.destroyAllWindows()
 
+# --- Toplu İşleme ---
+def write_landmarks(path, rel_path, image_digest, image_shape, landmarks, output_format):
+    """Poz sonucunu JSON veya NPZ olarak yazar."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    h, w = image_shape[:2]
+    if output_format == "npz":
+        np.savez_compressed(path, image=rel_path, image_sha1=image_digest, width=w, height=h,
+                            landmarks=np.zeros((0, 4), dtype=np.float32) if landmarks is None else landmarks)
+        return
+    record = {
+        'image': rel_path,
+        'image_sha1': image_digest,
+        'width': w,
+        'height': h,
+        'landmarks': [] if landmarks is None else [
+            {'name': landmark_enum.name, 'x': x, 'y': y, 'z': z, 'visibility': visibility}
+            for landmark_enum, (x, y, z, visibility) in zip(mp_pose.PoseLandmark, landmarks.tolist())
+        ],
+    }
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=4)
+
+def process_image_task(task):
+    """Toplu işlemede tek bir resmi işler; (göreli yol, durum, poz bulundu mu) döndürür."""
+    input_root, output_root, rel_path, output_format = task
+    image, landmarks, image_digest, from_cache = load_image_and_pose(os.path.join(input_root, rel_path))
+    if image is None:
+        return rel_path, 'error', False
+
+    base_path = os.path.splitext(rel_path)[0]
+    write_landmarks(os.path.join(output_root, "landmarks", f"{base_path}.{output_format}"),
+                    rel_path, image_digest, image.shape, landmarks, output_format)
+    annotated_path = os.path.join(output_root, "annotated", rel_path)
+    os.makedirs(os.path.dirname(annotated_path), exist_ok=True)
+    cv2.imwrite(annotated_path, draw_pose(image, landmarks))
+    return rel_path, 'cached' if from_cache else 'processed', landmarks is not None
+
+def run_batch(input_root, output_root, output_format=BATCH_OUTPUT_FORMAT, num_workers=BATCH_WORKERS):
+    """Klasör ağacındaki tüm resimleri süreç havuzunda işler; landmark dosyalarını ve işaretli resimleri yazar."""
+    if output_format not in ("json", "npz"):
+        print(f"Hata: Geçersiz çıktı biçimi '{output_format}' (json veya npz olmalı).")
+        return
+    if not os.path.isdir(input_root):
+        print(f"Hata: Resim klasörü '{input_root}' bulunamadı.")
+        return
+    image_files = find_images_recursive(input_root)
+    if not image_files:
+        print(f"'{input_root}' altında resim bulunamadı.")
+        return
+
+    num_workers = max(1, min(num_workers, len(image_files)))
+    print(f"{len(image_files)} resim {num_workers} süreçte işleniyor...")
+    tasks = [(input_root, output_root, rel_path, output_format) for rel_path in image_files]
+    counts = {'processed': 0, 'cached': 0, 'error': 0}
+    no_pose = 0
+    start_time = time.time()
+    # spawn: her süreç MediaPipe modelini kendisi yükler
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(num_workers) as pool:
+        for rel_path, status, has_pose in pool.imap_unordered(process_image_task, tasks, chunksize=4):
+            counts[status] += 1
+            if status == 'error':
+                print(f"UYARI: Resim yüklenemedi: {rel_path}")
+            elif not has_pose:
+                no_pose += 1
+
+    elapsed = time.time() - start_time
+    print(f"Tamamlandı: {counts['processed']} resim işlendi, {counts['cached']} resim önbellekten alındı, "
+          f"{counts['error']} resim okunamadı, {no_pose} resimde poz bulunamadı.")
+    print(f"Süre: {elapsed:.1f}s ({len(image_files) / elapsed:.1f} resim/sn). Çıktılar: {output_root}")
+
 # Uygulamayı başlat
 if __name__ == "__main__":
-    run_simple_pose_viewer()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="MediaPipe poz görüntüleyici ve toplu poz işleme")
+    parser.add_argument("--batch", action="store_true", help="Görüntüleyici yerine klasör ağacını toplu işle")
+    parser.add_argument("--input", default=IMAGE_FOLDER, help="Resim klasörü")
+    parser.add_argument("--output", default=BATCH_OUTPUT_DIR, help="Toplu işleme çıktı klasörü")
+    parser.add_argument("--format", default=BATCH_OUTPUT_FORMAT, choices=("json", "npz"), help="Landmark dosya biçimi")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Süreç sayısı")
+    args = parser.parse_args()
+    if args.batch:
+        run_batch(args.input, args.output, args.format, args.workers)
+    else:
+        IMAGE_FOLDER = args.input
+        run_simple_pose_viewer()
\ No newline at end of file